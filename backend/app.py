@@ -1,25 +1,237 @@
-from flask import Flask, request, jsonify
+import hmac
+import os
+import signal
+import threading
+
+from flask import Flask, request, jsonify, g, stream_with_context
 from flask_cors import CORS
 from knowledge_base import KnowledgeBase
+from kb_store import load_knowledge_base
+from kb_mmap import MappedKnowledgeBase
 from forward_chaining import ForwardChainingEngine
+from cache import DiagnosisCache
+from catalog import CatalogResponses
+from kb_manager import KnowledgeBaseManager
+from structured_log import RequestLog, setup_logging, stop_logging, logger
+from metrics import Metrics, server_timing
+from json_provider import create_json_provider
+from validation import RequestValidator
+from lookup_table import LookupTable, LookupTableError
+from matching import BitsetMatcher
 
 # Initialize Flask app
 app = Flask(__name__)
+app.json = create_json_provider(app)  # orjson jika terpasang (JSON_ENCODER), output compact
 CORS(app)  # Enable CORS untuk frontend
 
 # Initialize Knowledge Base dan Forward Chaining Engine
-kb = KnowledgeBase()
-engine = ForwardChainingEngine(kb)
+# Engine stateless (state per diagnosis ada di InferenceSession),
+# jadi satu instance aman dipakai bersama oleh semua request thread
+# KB_PATH: file knowledge base eksternal (JSON/YAML/SQLite, atau .kbm ter-compile
+# yang di-mmap, lihat kb_mmap.py), default data bawaan
+# KB_CACHE_DIR: direktori snapshot ter-compile untuk startup cepat
+def load_kb():
+    if os.environ.get('KB_PATH'):
+        return load_knowledge_base(os.environ['KB_PATH'], cache_dir=os.environ.get('KB_CACHE_DIR'))
+    return KnowledgeBase()
+
+# LOOKUP_TABLE: tabel hasil diagnosis 1-3 gejala (python lookup_table.py build),
+# hanya dipakai jika dibangun dari versi knowledge base yang sedang aktif
+def load_lookup_table(kb):
+    path = os.environ.get('LOOKUP_TABLE')
+    if not path:
+        return None
+    try:
+        table = LookupTable.open(path)
+    except (OSError, LookupTableError) as e:
+        logger.warning('lookup_table_skipped', extra={'fields': {'path': path, 'error': str(e)}})
+        return None
+    if table.version != kb.version:
+        logger.warning('lookup_table_skipped', extra={'fields': {
+            'path': path, 'error': 'kb_version mismatch',
+            'table_kb_version': table.version, 'kb_version': kb.version
+        }})
+        table.close()
+        return None
+    return table
+
+class DiagnosisState:
+    """
+    Semua objek yang terikat ke satu versi knowledge base
+    Dibangun ulang utuh saat hot-reload, lalu ditukar secara atomik.
+    """
+    
+    def __init__(self, kb):
+        self.kb = kb
+        # Tabel kode gejala untuk validasi request, di-compile sekali per versi
+        self.validator = RequestValidator(kb)
+        self.cache = DiagnosisCache(
+            maxsize=int(os.environ.get('DIAGNOSIS_CACHE_SIZE', 1024)),
+            ttl=float(os.environ.get('DIAGNOSIS_CACHE_TTL', 3600)) or None
+        )
+        # Tabel lookup ter-mmap (opsional): dibagi antar worker lewat page cache
+        self.lookup = load_lookup_table(kb)
+        self.engine = ForwardChainingEngine(kb, cache=self.cache, metrics=metrics, lookup=self.lookup)
+        # Engine khusus batch: matcher bitset men-score satu batch dengan satu perkalian
+        # matriks, hanya jika matriks dense bisa dibangun (numpy + MAX_DENSE_BYTES);
+        # fallback popcount bitset lebih lambat dari index, jadi pakai engine biasa.
+        # Matriks dibangun saat batch request pertama (per proses), bukan di sini.
+        # Knowledge base .kbm tidak memakai matriks: memori privat per worker
+        # tetap kecil, batch dijalankan dengan index yang di-mmap.
+        if BitsetMatcher.dense_fits(kb) and not isinstance(kb, MappedKnowledgeBase):
+            self.batch_engine = ForwardChainingEngine(kb, matcher='bitset', metrics=metrics, lookup=self.lookup)
+        else:
+            self.batch_engine = self.engine
+        # Response katalog di-serialize sekali per versi knowledge base
+        self.catalog = CatalogResponses(kb, app.json, max_age=int(os.environ.get('CATALOG_MAX_AGE', 300)))
+        # Compile matcher dan payload katalog sekarang, bukan di request pertama
+        # (dengan gunicorn --preload ini terjadi sebelum fork, dibagi copy-on-write)
+        self.engine.matcher
+        self.catalog.get('symptoms')
+        self.catalog.get('rules')
+
+setup_logging()
+request_log = RequestLog()
+
+# Latency per tahap (validate, match, rank, format, serialize, ...) + counter
+# Dipakai bersama oleh semua state, jadi tidak reset saat hot-reload
+# SERVER_TIMING=1: sertakan durasi per tahap di header Server-Timing
+metrics = Metrics()
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '').lower() in ('1', 'true', 'yes')
+
+# Status readiness (terpisah dari /api/health): siap setelah state pertama
+# selesai dibangun, tidak siap lagi saat proses sedang shutdown
+readiness = {'ready': False, 'draining': False}
+
+kb_manager = KnowledgeBaseManager(load_kb, DiagnosisState)
+readiness['ready'] = True
+
+def start_background_tasks():
+    """
+    Trigger reload: SIGHUP, polling file KB_PATH (KB_WATCH_INTERVAL detik),
+    atau POST /api/admin/reload
+    Dipanggil per proses yang melayani request (python app.py, post_worker_init
+    di gunicorn.conf.py, atau lifespan startup di asgi.py) karena thread tidak
+    ikut ter-fork. Harus setelah server memasang signal handler-nya sendiri.
+    """
+    setup_logging()
+    kb_manager.install_sighup_handler()
+    install_drain_handler()
+    if os.environ.get('KB_WATCH_INTERVAL'):
+        kb_manager.watch(os.environ.get('KB_PATH'), interval=float(os.environ['KB_WATCH_INTERVAL']))
+
+def stop_background_tasks():
+    """Flush log request terakhir; dipanggil setelah proses selesai melayani request"""
+    stop_logging()
+
+def mark_draining():
+    """Tandai proses sedang shutdown: /api/ready mulai membalas 503"""
+    readiness['draining'] = True
+
+def install_drain_handler():
+    """
+    SIGTERM (graceful shutdown / rolling restart) menandai proses draining,
+    lalu meneruskan ke handler SIGTERM server (gunicorn / uvicorn) yang sudah
+    terpasang. Tanpa handler server (dev server) SIGTERM tidak diubah.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return False
+    previous = signal.getsignal(signal.SIGTERM)
+    if not callable(previous):
+        return False
+    
+    def handle_sigterm(signum, frame):
+        mark_draining()
+        previous(signum, frame)
+    
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    signal.siginterrupt(signal.SIGTERM, False)  # sama seperti gunicorn: jangan ganggu request aktif
+    return True
+
+def current_state():
+    """State aktif untuk request ini (dipakai sampai request selesai)"""
+    state = kb_manager.current
+    g.kb_version = state.kb.version
+    return state
+
+def begin_timed_request():
+    """Mulai catat durasi per tahap untuk request ini (lihat record_request_metrics)"""
+    g.timings = metrics.begin_request()
+    return g.timings
+
+@app.after_request
+def add_kb_version_header(response):
+    """Setiap response menyebut versi knowledge base yang menghasilkannya"""
+    response.headers['X-KB-Version'] = g.get('kb_version') or kb_manager.version
+    return response
+
+@app.after_request
+def record_request_metrics(response):
+    """Counter request per endpoint/status + header Server-Timing (opsional)"""
+    timings = g.pop('timings', None)
+    if timings is not None:
+        metrics.end_request()
+        metrics.inc('requests', endpoint=request.endpoint, status=response.status_code)
+        if SERVER_TIMING and timings:
+            response.headers['Server-Timing'] = server_timing(timings)
+    return response
+
+# Maksimal jumlah item per request /api/diagnose/batch
+MAX_BATCH_SIZE = 5000
+
+# Streaming (NDJSON / Server-Sent Events): hasil dikirim per bagian saat
+# dihasilkan, jadi batch boleh lebih besar dan diproses per chunk
+STREAM_FORMATS = {'ndjson': 'application/x-ndjson', 'sse': 'text/event-stream'}
+MAX_STREAM_BATCH_SIZE = int(os.environ.get('MAX_STREAM_BATCH_SIZE', 100000))
+STREAM_BATCH_CHUNK = int(os.environ.get('STREAM_BATCH_CHUNK', 256))
+
+def requested_stream_format(data):
+    """
+    'ndjson' / 'sse' jika client meminta streaming, selain itu None
+    Lewat body ("stream": "ndjson" | "sse" | true) atau header Accept
+    (application/x-ndjson / text/event-stream).
+    """
+    stream = data.get('stream') if isinstance(data, dict) else None
+    if stream is True:
+        return 'ndjson'
+    if stream in STREAM_FORMATS:
+        return stream
+    best = request.accept_mimetypes.best_match(['application/json', *STREAM_FORMATS.values()])
+    for name, mimetype in STREAM_FORMATS.items():
+        if best == mimetype:
+            return name
+    return None
+
+def stream_response(stream_format, events):
+    """
+    Response streaming dari generator event (dict dengan key 'type')
+    NDJSON: satu JSON per baris. SSE: 'event: <type>' + 'data: <json>'.
+    """
+    def encode():
+        for event in events:
+            body = app.json.dumps(event)
+            if stream_format == 'sse':
+                yield f"event: {event['type']}\ndata: {body}\n\n"
+            else:
+                yield body + '\n'
+    
+    response = app.response_class(stream_with_context(encode()), mimetype=STREAM_FORMATS[stream_format])
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # proxy (nginx) jangan mem-buffer stream
+    return response
 
 @app.route('/')
 def home():
     """API info"""
+    state = current_state()
     return jsonify({
         'message': 'Laptop Diagnosis Expert System API',
         'version': '1.0.0',
+        'kb_version': state.kb.version,
         'endpoints': {
             '/api/symptoms': 'GET - Get all symptoms',
             '/api/diagnose': 'POST - Diagnose based on symptoms',
+            '/api/diagnose/batch': 'POST - Diagnose many symptom sets in one call',
             '/api/rules': 'GET - Get all rules in knowledge base'
         }
     })
@@ -30,12 +242,7 @@ def get_symptoms():
     Get daftar semua gejala yang tersedia
     """
     try:
-        symptoms = kb.get_all_symptoms()
-        return jsonify({
-            'success': True,
-            'data': symptoms,
-            'total': len(symptoms)
-        })
+        return current_state().catalog.response('symptoms', request)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -48,21 +255,7 @@ def get_rules():
     Get semua rules di knowledge base
     """
     try:
-        rules = kb.get_all_rules()
-        formatted_rules = []
-        
-        for rule_id, rule in rules.items():
-            formatted_rules.append({
-                'rule_id': rule_id,
-                'conditions': rule['conditions'],
-                'conclusion': rule['conclusion']
-            })
-        
-        return jsonify({
-            'success': True,
-            'data': formatted_rules,
-            'total': len(formatted_rules)
-        })
+        return current_state().catalog.response('rules', request)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -80,7 +273,8 @@ def diagnose():
         "detailed": true,  // optional, untuk trace lengkap
         "threshold": 60,   // optional, minimum confidence (default 60%)
         "top_n": 5,        // optional, max results (default 5)
-        "strict_mode": false  // optional, 100% match only (default false)
+        "strict_mode": false,  // optional, 100% match only (default false)
+        "stream": "ndjson"     // optional, "ndjson" / "sse" (atau header Accept)
     }
     
     Response:
@@ -99,93 +293,283 @@ def diagnose():
             }
         }
     }
+    
+    Response streaming (NDJSON, satu event per baris):
+    {"type": "start", "kb_version": "..."}
+    {"type": "symptoms", "data": [...]}        // detailed saja
+    {"type": "diagnosis", "data": {...}}       // per diagnosis
+    {"type": "step", "data": {...}}            // per reasoning step, detailed saja
+    {"type": "summary", "data": {...}}
     """
+    started = request_log.start()
+    timings = begin_timed_request()
     try:
-        data = request.get_json()
+        state = current_state()
+        with metrics.stage('validate'):
+            # Body bukan JSON (atau rusak) -> None, ditolak validator dengan 400
+            data = request.get_json(silent=True)
+            params, error = state.validator.validate(data)
         
-        if not data or 'symptoms' not in data:
+        if error:
+            request_log.emit('diagnose', started, status=400, error=error)
             return jsonify({
                 'success': False,
-                'error': 'Symptoms are required'
+                'error': error
             }), 400
         
-        symptoms = data['symptoms']
-        detailed = data.get('detailed', True)
-        threshold = data.get('threshold', 60)  # Default 60%
-        top_n = data.get('top_n', 5)  # Default 5 results
-        strict_mode = data.get('strict_mode', False)  # Default partial matching
+        stream_format = requested_stream_format(data)
+        if stream_format:
+            return stream_response(stream_format, diagnosis_events(state, params, started))
         
-        # Debug logging
-        print(f"\n🔍 DIAGNOSIS REQUEST:")
-        print(f"   Symptoms: {symptoms}")
-        print(f"   Threshold: {threshold}%")
-        print(f"   Top N: {top_n}")
-        print(f"   Strict Mode: {strict_mode}")
-        print(f"   Detailed: {detailed}\n")
+        # Jalankan forward chaining dengan partial matching
+        if params['detailed']:
+            result = state.engine.explain_diagnosis(
+                params['symptoms'], 
+                threshold=params['threshold'], 
+                top_n=params['top_n'], 
+                strict_mode=params['strict_mode']
+            )
+        else:
+            full_result = state.engine.run(
+                params['symptoms'], 
+                threshold=params['threshold'], 
+                top_n=params['top_n'], 
+                strict_mode=params['strict_mode'],
+                trace='off'  # trace tidak dikembalikan di mode non-detailed
+            )
+            with metrics.stage('format'):
+                result = format_diagnosis_result(state.engine, full_result, params)
         
-        # Validasi symptoms
-        valid_symptoms = set(kb.symptoms.keys())
-        invalid_symptoms = [s for s in symptoms if s not in valid_symptoms]
+        with metrics.stage('serialize'):
+            response = jsonify({
+                'success': True,
+                'data': result,
+                'kb_version': state.kb.version
+            })
         
-        if invalid_symptoms:
-            return jsonify({
-                'success': False,
-                'error': f'Invalid symptom codes: {invalid_symptoms}'
-            }), 400
+        # Request lambat: sertakan durasi per tahap + gejala untuk korelasi
+        request_log.emit(
+            'diagnose', started,
+            symptom_count=len(params['symptoms']),
+            threshold=params['threshold'],
+            top_n=params['top_n'],
+            strict_mode=params['strict_mode'],
+            detailed=params['detailed'],
+            cache_hit=state.cache.last_lookup_hit(),
+            kb_version=state.kb.version,
+            slow_fields=lambda: {
+                'symptoms': params['symptoms'],
+                'stages_ms': {stage: round(seconds * 1000, 3) for stage, seconds in timings.items()}
+            }
+        )
+        return response
         
-        if not symptoms:
+    except Exception as e:
+        request_log.emit('diagnose', started, status=500, error=str(e))
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def diagnosis_events(state, params, started):
+    """
+    Event streaming satu diagnosis
+    'start' dikirim sebelum inference, jadi time to first byte tidak
+    bergantung pada ukuran hasil.
+    """
+    yield {'type': 'start', 'kb_version': state.kb.version}
+    diagnoses = 0
+    try:
+        for event_type, payload in state.engine.iter_diagnosis(
+            params['symptoms'],
+            threshold=params['threshold'],
+            top_n=params['top_n'],
+            strict_mode=params['strict_mode'],
+            detailed=params['detailed']
+        ):
+            diagnoses += event_type == 'diagnosis'
+            yield {'type': event_type, 'data': payload}
+    except Exception as e:
+        request_log.emit('diagnose_stream', started, status=500, error=str(e))
+        yield {'type': 'error', 'error': str(e)}
+        return
+    
+    request_log.emit(
+        'diagnose_stream', started,
+        symptom_count=len(params['symptoms']),
+        threshold=params['threshold'],
+        top_n=params['top_n'],
+        strict_mode=params['strict_mode'],
+        detailed=params['detailed'],
+        diagnoses=diagnoses,
+        kb_version=state.kb.version
+    )
+
+@app.route('/api/diagnose/batch', methods=['POST'])
+def diagnose_batch():
+    """
+    Diagnose banyak symptom set sekaligus (mis. satu per tiket device)
+    
+    Request body:
+    {
+        "requests": [
+            {"symptoms": ["P01", "P02"], "threshold": 60, "top_n": 5, "strict_mode": false, "detailed": false},
+            ...
+        ]
+    }
+    
+    Response:
+    {
+        "success": true,
+        "data": [
+            {"success": true, "data": {...}},            // sama dengan data /api/diagnose
+            {"success": false, "error": "..."},         // error per item
+            ...
+        ],
+        "total": 2,
+        "total_errors": 1
+    }
+    
+    Dengan "stream": "ndjson" / "sse" (atau header Accept), item diproses per
+    chunk dan setiap hasil dikirim begitu selesai (batas MAX_STREAM_BATCH_SIZE):
+    {"type": "start", "total": 2, "kb_version": "..."}
+    {"type": "result", "index": 0, "success": true, "data": {...}}
+    {"type": "result", "index": 1, "success": false, "error": "..."}
+    {"type": "end", "total": 2, "total_errors": 1}
+    """
+    started = request_log.start()
+    timings = begin_timed_request()
+    try:
+        state = current_state()
+        data = request.get_json(silent=True)
+        
+        if not isinstance(data, dict) or not isinstance(data.get('requests'), list):
             return jsonify({
                 'success': False,
-                'error': 'At least one symptom is required'
+                'error': 'A list of requests is required'
             }), 400
         
-        # Validasi threshold
-        if not (0 <= threshold <= 100):
+        items = data['requests']
+        stream_format = requested_stream_format(data)
+        max_size = MAX_STREAM_BATCH_SIZE if stream_format else MAX_BATCH_SIZE
+        if len(items) > max_size:
             return jsonify({
                 'success': False,
-                'error': 'Threshold must be between 0 and 100'
+                'error': f'Batch size must not exceed {max_size}'
             }), 400
         
-        # Jalankan forward chaining dengan partial matching
-        if detailed:
-            result = engine.explain_diagnosis(
-                symptoms, 
-                threshold=threshold, 
-                top_n=top_n, 
-                strict_mode=strict_mode
-            )
-        else:
-            # Simple mode: hanya return diagnoses dengan confidence
-            full_result = engine.run(
-                symptoms, 
-                threshold=threshold, 
-                top_n=top_n, 
-                strict_mode=strict_mode
-            )
-            result = {
-                'diagnoses_found': full_result['diagnoses'],
-                'total_candidates': full_result.get('total_candidates', 0),
-                'threshold_used': full_result.get('threshold_used', threshold)
-            }
+        if stream_format:
+            return stream_response(stream_format, batch_events(state, items, started))
         
-        return jsonify({
-            'success': True,
-            'data': result
-        })
+        results, total_errors = run_batch_items(state, items)
+        
+        with metrics.stage('serialize'):
+            response = jsonify({
+                'success': True,
+                'data': results,
+                'total': len(results),
+                'total_errors': total_errors,
+                'kb_version': state.kb.version
+            })
+        
+        request_log.emit(
+            'diagnose_batch', started,
+            items=len(results),
+            errors=total_errors,
+            kb_version=state.kb.version,
+            slow_fields=lambda: {
+                'stages_ms': {stage: round(seconds * 1000, 3) for stage, seconds in timings.items()}
+            }
+        )
+        return response
         
     except Exception as e:
+        request_log.emit('diagnose_batch', started, status=500, error=str(e))
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+def run_batch_items(state, items):
+    """
+    Validasi + diagnosis sekumpulan item batch
+    Return: (list hasil per item, jumlah item yang error)
+    """
+    # Validasi semua item dalam satu pass
+    results = [None] * len(items)
+    valid = []
+    with metrics.stage('validate'):
+        for i, item in enumerate(items):
+            params, error = state.validator.validate(item)
+            if error:
+                results[i] = {'success': False, 'error': error}
+            else:
+                valid.append((i, params))
+    
+    # Jalankan semua item valid sekaligus dengan compiled view yang sama
+    # Trace hanya dibangun untuk item detailed
+    full_results = state.batch_engine.run_batch([
+        dict(params, trace='full' if params['detailed'] else 'off')
+        for _, params in valid
+    ])
+    with metrics.stage('format'):
+        for (i, params), full_result in zip(valid, full_results):
+            results[i] = {
+                'success': True,
+                'data': format_diagnosis_result(state.batch_engine, full_result, params)
+            }
+    
+    return results, len(items) - len(valid)
+
+def batch_events(state, items, started):
+    """Event streaming batch: item diproses per STREAM_BATCH_CHUNK, hasil dikirim per item"""
+    yield {'type': 'start', 'total': len(items), 'kb_version': state.kb.version}
+    total_errors = 0
+    try:
+        for offset in range(0, len(items), STREAM_BATCH_CHUNK):
+            results, errors = run_batch_items(state, items[offset:offset + STREAM_BATCH_CHUNK])
+            total_errors += errors
+            for i, result in enumerate(results, offset):
+                yield dict(result, type='result', index=i)
+    except Exception as e:
+        request_log.emit('diagnose_batch_stream', started, status=500, error=str(e))
+        yield {'type': 'error', 'error': str(e)}
+        return
+    
+    request_log.emit(
+        'diagnose_batch_stream', started,
+        items=len(items),
+        errors=total_errors,
+        kb_version=state.kb.version
+    )
+    yield {'type': 'end', 'total': len(items), 'total_errors': total_errors}
+
+def format_diagnosis_result(diagnosis_engine, full_result, params):
+    """
+    Bentuk data response dari hasil engine.run()
+    detailed: penjelasan lengkap, selain itu hanya diagnoses dengan confidence
+    """
+    if params['detailed']:
+        return diagnosis_engine.explain_result(
+            full_result,
+            params['symptoms'],
+            strict_mode=params['strict_mode']
+        )
+    
+    # Simple mode: hanya return diagnoses dengan confidence
+    return {
+        'diagnoses_found': full_result['diagnoses'],
+        'total_candidates': full_result.get('total_candidates', 0),
+        'threshold_used': full_result.get('threshold_used', params['threshold'])
+    }
+
 @app.route('/api/symptom/<symptom_code>', methods=['GET'])
 def get_symptom_detail(symptom_code):
     """
     Get detail dari satu symptom
     """
     try:
-        description = kb.get_symptom_description(symptom_code)
+        description = current_state().kb.get_symptom_description(symptom_code)
         
         if description == "Unknown symptom":
             return jsonify({
@@ -206,15 +590,110 @@ def get_symptom_detail(symptom_code):
             'error': str(e)
         }), 500
 
+@app.route('/api/admin/reload', methods=['POST'])
+def reload_knowledge_base():
+    """
+    Reload knowledge base (load + index di background, lalu swap atomik)
+    Header: X-Admin-Token harus sama dengan env ADMIN_TOKEN
+    Query: ?wait=1 untuk menunggu reload selesai
+    """
+    error = check_admin_token()
+    if error:
+        return error
+    
+    wait = request.args.get('wait') in ('1', 'true')
+    try:
+        started = kb_manager.reload(background=not wait)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Reload failed: {e}',
+            'data': kb_manager.status()
+        }), 500
+    
+    if not started:
+        return jsonify({
+            'success': False,
+            'error': 'Reload already in progress',
+            'data': kb_manager.status()
+        }), 409
+    
+    return jsonify({
+        'success': True,
+        'data': kb_manager.status()
+    }), 200 if wait else 202
+
+@app.route('/api/admin/kb', methods=['GET'])
+def knowledge_base_status():
+    """Status knowledge base aktif dan reload terakhir"""
+    error = check_admin_token()
+    if error:
+        return error
+    return jsonify({
+        'success': True,
+        'data': kb_manager.status()
+    })
+
+def check_admin_token():
+    """Return response error jika token admin tidak valid, selain itu None"""
+    token = os.environ.get('ADMIN_TOKEN')
+    if not token:
+        return jsonify({
+            'success': False,
+            'error': 'Admin endpoints are disabled (ADMIN_TOKEN not set)'
+        }), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token):
+        return jsonify({
+            'success': False,
+            'error': 'Invalid admin token'
+        }), 401
+    return None
+
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """
+    Readiness probe: 200 jika proses siap menerima traffic
+    (knowledge base ter-load dan ter-index, tidak sedang shutdown), selain itu 503
+    """
+    if not readiness['ready']:
+        return jsonify({'success': False, 'status': 'starting', 'kb_version': None}), 503
+    ready = not readiness['draining']
+    return jsonify({
+        'success': ready,
+        'status': 'ready' if ready else 'draining',
+        'kb_version': kb_manager.version
+    }), 200 if ready else 503
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
+    state = current_state()
     return jsonify({
         'success': True,
         'status': 'healthy',
-        'message': 'API is running'
+        'message': 'API is running',
+        'kb_version': state.kb.version,
+        'cache': state.cache.stats()
     })
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    Metrics format Prometheus: latency per tahap (p50/p95/p99), counter request,
+    dan gauge statistik cache/knowledge base. Angka per proses worker.
+    """
+    state = current_state()
+    cache_stats = state.cache.stats()
+    gauges = {
+        f'cache_{name}': value
+        for name, value in cache_stats.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    }
+    gauges['kb_rules'] = len(state.kb.rules)
+    gauges['kb_reload_count'] = kb_manager.reload_count
+    gauges['lookup_slots'] = state.lookup.n_slots if state.lookup else 0
+    return app.response_class(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     print("=" * 60)
     print("🚀 Laptop Diagnosis Expert System API")
@@ -224,14 +703,18 @@ if __name__ == '__main__':
     print("\n🔧 Available endpoints:")
     print("   GET  /api/symptoms  - Get all symptoms")
     print("   POST /api/diagnose  - Diagnose laptop issues")
+    print("   POST /api/diagnose/batch - Diagnose many symptom sets")
     print("   GET  /api/rules     - Get all rules")
     print("   GET  /api/health    - Health check")
+    print("   GET  /api/ready     - Readiness check")
+    print("   GET  /api/metrics   - Prometheus metrics")
     print("=" * 60)
     print()
     
     # Get port from environment variable for production (Render)
-    import os
+    # Production: pakai gunicorn (lihat gunicorn.conf.py), bukan dev server ini
+    start_background_tasks()
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_ENV') != 'production'
     
-    app.run(debug=debug, host='0.0.0.0', port=port)
+    app.run(debug=debug, host='0.0.0.0', port=port, threaded=True)
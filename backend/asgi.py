@@ -0,0 +1,283 @@
+# Entry point ASGI (asyncio)
+# uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 2
+#
+# Koneksi (termasuk ribuan koneksi keep-alive yang idle dari kiosk) ditangani
+# event loop, bukan satu thread per koneksi. Route sama persis dengan app.py:
+# setiap request diteruskan ke Flask app di executor thread yang dibatasi.
+# Jika semua thread sibuk dan antrian penuh, request langsung dibalas 503
+# dengan Retry-After, jadi latency tidak naik tanpa batas.
+#
+# Response streaming (NDJSON/SSE) memakai satu executor thread dari awal
+# sampai selesai; chunk diteruskan ke event loop lewat antrian terbatas, dan
+# thread berhenti jika client putus.
+#
+# Environment:
+#   ASGI_WORKER_THREADS  thread executor untuk scoring (default 4)
+#   ASGI_MAX_QUEUE       request yang boleh menunggu thread (default 64)
+#   ASGI_MAX_BODY        ukuran body maksimal dalam byte (default 8 MB)
+#   ASGI_STREAM_BUFFER   chunk streaming yang boleh menunggu dikirim per response (default 8)
+
+import asyncio
+import io
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app import app as flask_app, mark_draining, start_background_tasks, stop_background_tasks
+
+
+class BoundedExecutor:
+    """
+    ThreadPoolExecutor dengan admission control
+    Maksimal max_workers request berjalan + max_queue menunggu; sisanya ditolak.
+    """
+
+    def __init__(self, max_workers, max_queue):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='asgi-worker')
+        self.in_flight = 0
+        self.rejected = 0
+
+    def try_acquire(self):
+        # Hanya dipanggil dari event loop (single thread), tidak perlu lock
+        if self.in_flight >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+
+    def start(self, func, *args):
+        """
+        Jalankan func di executor (slot sudah di-acquire), return asyncio future
+        Slot dilepas saat func selesai, juga jika pemanggil berhenti menunggu.
+        """
+        future = asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        future.add_done_callback(lambda _: self.release())
+        return future
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+class ResponseChannel:
+    """
+    Pesan ASGI dari executor thread ke event loop
+    Thread diblokir jika max_pending pesan belum diambil event loop
+    (backpressure untuk client yang lambat). close() dari event loop
+    membatalkan thread di put() berikutnya.
+    """
+
+    class Closed(Exception):
+        pass
+
+    def __init__(self, loop, max_pending):
+        self.loop = loop
+        self.queue = asyncio.Queue()
+        self.slots = threading.Semaphore(max_pending)
+        self.closed = False
+
+    def put(self, message):
+        # Dipanggil dari executor thread
+        self.slots.acquire()
+        if self.closed:
+            raise self.Closed()
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, message)
+
+    def finish(self):
+        # Dipanggil dari executor thread setelah pesan terakhir (juga saat error)
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, None)
+
+    async def get(self):
+        """Pesan berikutnya, None jika thread sudah selesai"""
+        message = await self.queue.get()
+        if message is not None:
+            self.slots.release()
+        return message
+
+    def close(self):
+        self.closed = True
+        self.slots.release()  # bangunkan thread yang sedang menunggu slot
+
+
+class WSGIBridgeApp:
+    """Aplikasi ASGI yang menjalankan Flask app di BoundedExecutor"""
+
+    def __init__(self, wsgi_app, max_workers=4, max_queue=64, max_body=8 * 1024 * 1024, stream_buffer=8):
+        self.wsgi_app = wsgi_app
+        self.max_body = max_body
+        self.stream_buffer = stream_buffer
+        self.pool = BoundedExecutor(max_workers, max_queue)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # Setelah server memasang signal handler: SIGTERM menandai draining
+                start_background_tasks()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                mark_draining()
+                await asyncio.get_running_loop().run_in_executor(None, self.pool.shutdown)
+                # Semua request selesai: baru flush dan hentikan log
+                stop_background_tasks()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def http(self, scope, receive, send):
+        body = await self.read_body(receive)
+        if body is None:
+            await self.send_error(send, 413, 'Request body too large')
+            return
+
+        # Backpressure: tolak cepat daripada mengantri tanpa batas
+        if not self.pool.try_acquire():
+            await self.send_error(send, 503, 'Server busy, please retry', {'retry-after': '1'})
+            return
+
+        # Seluruh response (panggilan app sampai close() iterable-nya) berjalan
+        # di satu executor thread; event loop hanya mengirim pesan dari channel
+        channel = ResponseChannel(asyncio.get_running_loop(), self.stream_buffer)
+        future = self.pool.start(self.call_wsgi, scope, body, channel)
+        watcher = asyncio.ensure_future(self.watch_disconnect(receive, channel))
+        try:
+            while True:
+                message = await channel.get()
+                if message is None:
+                    break
+                await send(message)
+        finally:
+            watcher.cancel()
+            channel.close()
+        await future  # error dari app diteruskan ke server
+
+    async def watch_disconnect(self, receive, channel):
+        """Client putus sebelum response selesai: hentikan iterable response di thread-nya"""
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        channel.close()
+
+    async def read_body(self, receive):
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_body:
+                return None
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                break
+        return b''.join(chunks)
+
+    def call_wsgi(self, scope, body, channel):
+        """
+        Jalankan Flask app di executor thread dan kirim response lewat channel
+        Iterable response diiterasi dan ditutup di thread yang sama dengan
+        panggilan app: stream_with_context memegang request context Flask
+        (context variable) yang hanya bisa di-pop di thread yang mem-push-nya.
+        """
+        try:
+            environ = build_environ(scope, body)
+            response = {}
+
+            def start_response(status, headers, exc_info=None):
+                response['status'] = int(status.split(' ', 1)[0])
+                response['headers'] = [
+                    (name.lower().encode('latin-1'), value.encode('latin-1'))
+                    for name, value in headers
+                ]
+                return lambda data: None
+
+            result = self.wsgi_app(environ, start_response)
+            try:
+                iterator = iter(result)
+                # Chunk pertama memastikan start_response sudah dipanggil
+                first = next(iterator, b'')
+                start = {'type': 'http.response.start', 'status': response['status'], 'headers': response['headers']}
+
+                if any(name == b'content-length' for name, _ in response['headers']):
+                    # Response biasa (ukuran diketahui): kirim sekaligus
+                    body = b''.join([first, *iterator])
+                    channel.put(start)
+                    channel.put({'type': 'http.response.body', 'body': body})
+                    return
+
+                # Response streaming: kirim per chunk begitu dihasilkan
+                channel.put(start)
+                if first:
+                    channel.put({'type': 'http.response.body', 'body': first, 'more_body': True})
+                for chunk in iterator:
+                    if chunk:
+                        channel.put({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                channel.put({'type': 'http.response.body', 'body': b''})
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+        except ResponseChannel.Closed:
+            pass  # client sudah tidak menunggu response
+        finally:
+            channel.finish()
+
+    async def send_error(self, send, status, message, extra_headers=None):
+        body = json.dumps({'success': False, 'error': message}).encode('utf-8')
+        headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+        for name, value in (extra_headers or {}).items():
+            headers.append((name.encode('latin-1'), value.encode('latin-1')))
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+
+def build_environ(scope, body):
+    """WSGI environ dari ASGI HTTP scope"""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'CONTENT_LENGTH':
+            key = f'HTTP_{name}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+app = WSGIBridgeApp(
+    flask_app,
+    max_workers=int(os.environ.get('ASGI_WORKER_THREADS', 4)),
+    max_queue=int(os.environ.get('ASGI_MAX_QUEUE', 64)),
+    max_body=int(os.environ.get('ASGI_MAX_BODY', 8 * 1024 * 1024)),
+    stream_buffer=int(os.environ.get('ASGI_STREAM_BUFFER', 8))
+)
@@ -0,0 +1,416 @@
+# Benchmark inference engine dan API
+#
+#   python benchmark.py                          # semua ukuran default, hasil JSON ke stdout
+#   python benchmark.py --quick -o bench.json    # ukuran kecil saja, simpan ke file
+#   python benchmark.py --compare old.json       # bandingkan dengan hasil commit sebelumnya
+#
+# Setiap skenario dijalankan dengan workload yang sama (seed tetap), jadi
+# hasil antar commit bisa dibandingkan langsung. Ringkasan tabel ditulis ke
+# stderr, hasil lengkap (machine-readable) ke JSON.
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+
+from knowledge_base import KnowledgeBase
+from forward_chaining import ForwardChainingEngine
+from cache import DiagnosisCache
+from synthetic import generate_symptom_sets, generate_traffic, synthetic_knowledge_base
+from json_provider import JSON_PROVIDERS, orjson
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_SIZES = ['builtin', '1000x50', '10000x500', '100000x5000']
+QUICK_SIZES = ['builtin', '1000x50']
+
+def summarize(latencies, elapsed):
+    """Statistik latency (ms) dari list durasi per panggilan (detik)"""
+    ordered = sorted(latencies)
+    last = len(ordered) - 1
+
+    def pct(q):
+        return round(ordered[min(last, int(round(q * last)))] * 1000, 4)
+
+    return {
+        'calls': len(ordered),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 4),
+        'p50_ms': pct(0.5),
+        'p95_ms': pct(0.95),
+        'p99_ms': pct(0.99),
+        'max_ms': round(ordered[-1] * 1000, 4),
+        'ops_per_sec': round(len(ordered) / elapsed, 1) if elapsed > 0 else None
+    }
+
+
+def time_calls(func, inputs, warmup=50):
+    """Panggil func(x) untuk setiap input, ukur latency per panggilan"""
+    for x in inputs[:warmup]:
+        func(x)
+    latencies = []
+    clock = time.perf_counter
+    started = clock()
+    for x in inputs:
+        t0 = clock()
+        func(x)
+        latencies.append(clock() - t0)
+    return summarize(latencies, clock() - started)
+
+
+def load_size(size, seed, zipf=0.0):
+    """'builtin' atau '<rules>x<symptoms>' -> KnowledgeBase"""
+    if size == 'builtin':
+        return KnowledgeBase()
+    n_rules, n_symptoms = (int(n) for n in size.lower().split('x'))
+    # 5% rule meng-assert fakta antara supaya strict mode juga menjalankan chaining
+    return synthetic_knowledge_base(n_rules, n_symptoms, zipf=zipf, chain_ratio=0.05, seed=seed)
+
+
+def engine_scenarios(kb, workload, threshold, top_n, batch_size, seed=0, zipf=0.0):
+    """
+    Skenario engine: dict nama -> fungsi tanpa argumen yang return statistik
+    Semua memakai workload yang sama, kecuali run_cached_traffic
+    (trace dengan symptom set yang berulang, cache mulai kosong).
+    """
+    index = ForwardChainingEngine(kb)
+    scenarios = {
+        'run': lambda: time_calls(lambda s: index.run(s, threshold=threshold, top_n=top_n), workload),
+        'run_trace_off': lambda: time_calls(
+            lambda s: index.run(s, threshold=threshold, top_n=top_n, trace='off'), workload),
+        'explain_diagnosis': lambda: time_calls(
+            lambda s: index.explain_diagnosis(s, threshold=threshold, top_n=top_n), workload),
+        'strict_mode': lambda: time_calls(
+            lambda s: index.run(s, threshold=threshold, top_n=top_n, strict_mode=True), workload),
+    }
+
+    cached = ForwardChainingEngine(kb, cache=DiagnosisCache(maxsize=len(workload)))
+    for symptoms in workload:
+        cached.run(symptoms, threshold=threshold, top_n=top_n, trace='off')
+    scenarios['run_cached'] = lambda: time_calls(
+        lambda s: cached.run(s, threshold=threshold, top_n=top_n, trace='off'), workload)
+
+    def cached_traffic():
+        cache = DiagnosisCache(maxsize=1024)
+        engine = ForwardChainingEngine(kb, cache=cache)
+        traffic = generate_traffic(kb, len(workload), unique=len(workload) // 2, zipf=zipf,
+                                   threshold=threshold, top_n=top_n, seed=seed)
+        stats = time_calls(lambda r: engine.run(r['symptoms'], threshold=r['threshold'], top_n=r['top_n'],
+                                                strict_mode=r['strict_mode'], trace='off'), traffic, warmup=0)
+        stats['cache_hit_rate'] = cache.stats()['hit_rate']
+        return stats
+    scenarios['run_cached_traffic'] = cached_traffic
+
+    # Skenario bitset hanya jika matriks dense muat (lihat matching.MAX_DENSE_BYTES);
+    # fallback popcount-nya O(jumlah rule) per request dan tidak relevan di skala ini
+    bitset = ForwardChainingEngine(kb, matcher='bitset')
+    if bitset.matcher.matrix is not None:
+        scenarios['run_bitset'] = lambda: time_calls(
+            lambda s: bitset.run(s, threshold=threshold, top_n=top_n, trace='off'), workload)
+
+        chunks = [workload[i:i + batch_size] for i in range(0, len(workload), batch_size)]
+
+        def batch():
+            stats = time_calls(lambda chunk: bitset.run_batch([
+                {'symptoms': s, 'threshold': threshold, 'top_n': top_n, 'trace': 'off'} for s in chunk
+            ]), chunks, warmup=1)
+            stats['batch_size'] = batch_size
+            stats['items_per_sec'] = round(stats['ops_per_sec'] * batch_size, 1) if stats['ops_per_sec'] else None
+            return stats
+        scenarios['run_batch_bitset'] = batch
+
+    return scenarios
+
+
+def serialize_scenarios(kb, workload, threshold, top_n):
+    """
+    Skenario serialisasi response /api/diagnose per JSON provider
+    (serialize_stdlib, serialize_orjson jika terpasang): body detailed
+    dari explain_diagnosis, di-serialize seperti jsonify (compact).
+    """
+    from flask import Flask
+
+    app = Flask('benchmark')
+    engine = ForwardChainingEngine(kb)
+    payloads = []
+
+    def scenario(provider_class):
+        provider = provider_class(app)
+        if not payloads:
+            payloads.extend(
+                {'success': True, 'data': engine.explain_diagnosis(s, threshold=threshold, top_n=top_n)}
+                for s in workload
+            )
+        stats = time_calls(provider.response, payloads)
+        stats['bytes_mean'] = round(sum(len(provider.response(p).get_data()) for p in payloads) / len(payloads), 1)
+        return stats
+
+    return {
+        f'serialize_{name}': (lambda provider_class=provider_class: scenario(provider_class))
+        for name, provider_class in JSON_PROVIDERS.items()
+    }
+
+
+def concurrency_check(kb, workload, threads=32, calls_per_thread=300, threshold=30, top_n=10):
+    """
+    Stress check: satu engine dipakai bersama banyak thread,
+    setiap hasil harus sama dengan hasil sekuensial
+    """
+    engine = ForwardChainingEngine(kb)
+    cases = workload[:400]
+
+    def key(result):
+        return [(d['rule_id'], d.get('confidence')) for d in result['diagnoses']], len(result['trace'])
+
+    expected = [key(engine.run(c, threshold=threshold, top_n=top_n)) for c in cases]
+    errors = []
+
+    def worker(seed):
+        rng = random.Random(seed)
+        for _ in range(calls_per_thread):
+            i = rng.randrange(len(cases))
+            if key(engine.run(cases[i], threshold=threshold, top_n=top_n)) != expected[i]:
+                errors.append(i)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # paksa context switch sesering mungkin
+    started = time.perf_counter()
+    try:
+        workers = [threading.Thread(target=worker, args=(seed,)) for seed in range(threads)]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    return {
+        'threads': threads,
+        'calls': threads * calls_per_thread,
+        'errors': len(errors),
+        'elapsed_s': round(time.perf_counter() - started, 3)
+    }
+
+
+def api_load_test(kb, workload, threads, threshold, top_n):
+    """
+    Load test end-to-end /api/diagnose lewat Flask test client
+    (routing, validasi, inference, format, serialisasi JSON)
+    Sekuensial lalu concurrent dengan beberapa thread.
+    """
+    import app as app_module
+
+    # Log per request akan mendominasi waktu: matikan selama benchmark
+    app_module.request_log.sample_rate = 0
+    app_module.request_log.slow_ms = float('inf')
+    app_module.kb_manager.current = app_module.DiagnosisState(kb)
+
+    bodies = [
+        {'symptoms': s, 'threshold': threshold, 'top_n': top_n, 'detailed': i % 4 == 0}
+        for i, s in enumerate(workload)
+    ]
+    failures = []
+
+    def post(client, body):
+        response = client.post('/api/diagnose', json=body)
+        if response.status_code != 200:
+            failures.append(response.status_code)
+
+    client = app_module.app.test_client()
+    results = {'sequential': time_calls(lambda body: post(client, body), bodies)}
+
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(part):
+        local_client = app_module.app.test_client()
+        local = []
+        for body in part:
+            t0 = time.perf_counter()
+            post(local_client, body)
+            local.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(bodies[i::threads],)) for i in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    concurrent = summarize(latencies, time.perf_counter() - started)
+    concurrent['threads'] = threads
+    results['concurrent'] = concurrent
+    results['failures'] = len(failures)
+    return results
+
+
+def environment():
+    """Info environment untuk membandingkan hasil antar mesin/commit"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__ if np is not None else None,
+        'orjson': orjson.__version__ if orjson is not None else None
+    }
+
+
+def run_benchmarks(args, log):
+    report = {'environment': environment(), 'config': vars(args).copy(), 'results': []}
+    report['config'].pop('compare', None)
+
+    for size in args.sizes:
+        started = time.perf_counter()
+        kb = load_size(size, args.seed, args.zipf)
+        build_s = time.perf_counter() - started
+        workload = generate_symptom_sets(kb, args.requests, zipf=args.zipf, seed=args.seed)
+        entry = {
+            'size': size,
+            'rules': len(kb.rules),
+            'symptoms': len(kb.symptoms),
+            'kb_build_s': round(build_s, 3),
+            'scenarios': {}
+        }
+        log(f'== {size}: {len(kb.rules)} rules, {len(kb.symptoms)} symptoms (index {build_s:.2f}s)')
+
+        scenarios = engine_scenarios(kb, workload, args.threshold, args.top_n, args.batch_size,
+                                     seed=args.seed, zipf=args.zipf)
+        scenarios.update(serialize_scenarios(kb, workload, args.threshold, args.top_n))
+        for name, scenario in scenarios.items():
+            if args.scenarios and name not in args.scenarios:
+                continue
+            stats = scenario()
+            entry['scenarios'][name] = stats
+            log(f"   {name:<20} p50 {stats['p50_ms']:>9.3f} ms  p95 {stats['p95_ms']:>9.3f} ms  "
+                f"{stats['ops_per_sec'] or 0:>10.1f} ops/s")
+
+        if not args.skip_api and (not args.scenarios or 'api' in args.scenarios):
+            api = api_load_test(kb, workload, args.api_threads, args.threshold, args.top_n)
+            entry['scenarios']['api_sequential'] = api['sequential']
+            entry['scenarios']['api_concurrent'] = api['concurrent']
+            entry['api_failures'] = api['failures']
+            for name in ('api_sequential', 'api_concurrent'):
+                stats = entry['scenarios'][name]
+                log(f"   {name:<20} p50 {stats['p50_ms']:>9.3f} ms  p95 {stats['p95_ms']:>9.3f} ms  "
+                    f"{stats['ops_per_sec'] or 0:>10.1f} ops/s")
+
+        report['results'].append(entry)
+
+    if not args.skip_concurrency:
+        kb = KnowledgeBase()
+        check = concurrency_check(kb, generate_symptom_sets(kb, 400, seed=args.seed))
+        report['concurrency_check'] = check
+        log(f"== concurrency check: {check['calls']} calls / {check['threads']} threads, "
+            f"{check['errors']} mismatches")
+
+    return report
+
+
+def compare(report, baseline, max_regression, log):
+    """
+    Bandingkan p50/p95 dengan hasil sebelumnya
+    Return daftar regresi (rasio > max_regression)
+    """
+    previous = {
+        (entry['size'], name): stats
+        for entry in baseline.get('results', [])
+        for name, stats in entry['scenarios'].items()
+    }
+    regressions = []
+    log(f"== compare with {baseline.get('environment', {}).get('commit') or 'baseline'}")
+    for entry in report['results']:
+        for name, stats in entry['scenarios'].items():
+            old = previous.get((entry['size'], name))
+            if not old:
+                continue
+            for metric in ('p50_ms', 'p95_ms'):
+                if not old[metric]:
+                    continue
+                ratio = stats[metric] / old[metric]
+                if ratio > max_regression:
+                    regressions.append({
+                        'size': entry['size'], 'scenario': name, 'metric': metric,
+                        'before': old[metric], 'after': stats[metric], 'ratio': round(ratio, 3)
+                    })
+            ratio = stats['p50_ms'] / old['p50_ms'] if old['p50_ms'] else 0
+            log(f"   {entry['size']:<14} {name:<20} p50 {old['p50_ms']:.3f} -> {stats['p50_ms']:.3f} ms ({ratio:.2f}x)")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark forward chaining engine dan /api/diagnose')
+    parser.add_argument('--sizes', nargs='+', default=None,
+                        help="ukuran KB: 'builtin' atau '<rules>x<symptoms>' (default: %s)" % ' '.join(DEFAULT_SIZES))
+    parser.add_argument('--quick', action='store_true', help='hanya ukuran kecil (%s)' % ' '.join(QUICK_SIZES))
+    parser.add_argument('--scenarios', nargs='+', default=None,
+                        help='jalankan skenario tertentu saja (mis. run explain_diagnosis api)')
+    parser.add_argument('--requests', type=int, default=2000, help='jumlah request per skenario')
+    parser.add_argument('--threshold', type=float, default=60)
+    parser.add_argument('--top-n', type=int, default=5)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--api-threads', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--zipf', type=float, default=0.0,
+                        help='skew popularitas gejala di KB sintetis dan workload (0 = uniform)')
+    parser.add_argument('--skip-api', action='store_true', help='tanpa load test Flask')
+    parser.add_argument('--skip-concurrency', action='store_true', help='tanpa stress check thread')
+    parser.add_argument('-o', '--output', help='tulis hasil JSON ke file (default stdout)')
+    parser.add_argument('--compare', help='file JSON hasil sebelumnya untuk dibandingkan')
+    parser.add_argument('--max-regression', type=float, default=1.25,
+                        help='exit code 1 jika p50/p95 lebih lambat dari rasio ini (dengan --compare)')
+    args = parser.parse_args(argv)
+    args.sizes = args.sizes or (QUICK_SIZES if args.quick else DEFAULT_SIZES)
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    def log(message):
+        print(message, file=sys.stderr, flush=True)
+
+    report = run_benchmarks(args, log)
+
+    exit_code = 0
+    if report.get('concurrency_check', {}).get('errors'):
+        exit_code = 1
+    if any(entry.get('api_failures') for entry in report['results']):
+        exit_code = 1
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.max_regression, log)
+        report['regressions'] = regressions
+        if regressions:
+            log(f'== {len(regressions)} regression(s) above {args.max_regression}x')
+            exit_code = 1
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+        log(f'Results written to {args.output}')
+    else:
+        print(output)
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
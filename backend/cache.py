@@ -0,0 +1,106 @@
+# Cache hasil diagnosis (LRU + TTL)
+# Dipakai ForwardChainingEngine di depan run() / explain_diagnosis()
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class DiagnosisCache:
+    """
+    LRU cache dengan TTL untuk hasil diagnosis
+
+    - maxsize: jumlah entry maksimal, entry paling lama tidak dipakai dibuang
+    - ttl: umur entry dalam detik (None = tidak pernah expired)
+    - Cache otomatis dikosongkan jika revision knowledge base berubah
+    - Thread-safe, aman dipakai bersama oleh banyak request thread
+
+    Nilai yang disimpan dikembalikan apa adanya ke semua pemanggil,
+    jadi perlakukan hasil diagnosis sebagai read-only.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.revision = None
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._local = threading.local()  # hasil lookup terakhir per thread
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(symptoms, threshold, top_n, strict_mode, detailed, trace='full'):
+        """
+        Key kanonik: symptom set terurut (tanpa duplikat) + parameter diagnosis
+        Jumlah gejala input ikut di key, karena duplikat mengubah adaptive
+        threshold dan total_symptoms.
+        """
+        return (tuple(sorted(set(symptoms))), len(symptoms), threshold, top_n, bool(strict_mode), bool(detailed), trace)
+
+    def _check_revision(self, revision):
+        # Dipanggil dengan lock terpegang
+        if revision != self.revision:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.revision = revision
+
+    def get(self, key, revision):
+        """Return nilai ter-cache atau None (miss)"""
+        with self._lock:
+            self._check_revision(revision)
+            entry = self._entries.get(key)
+            self._local.hit = False
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self._local.hit = True
+            return value
+
+    def put(self, key, value, revision):
+        """Simpan nilai, buang entry LRU jika melebihi maxsize"""
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._check_revision(revision)
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def last_lookup_hit(self):
+        """True/False untuk lookup terakhir di thread ini, None jika belum ada"""
+        return getattr(self._local, 'hit', None)
+
+    def clear(self):
+        """Kosongkan cache (counter tidak di-reset)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Counter cache untuk monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,125 @@
+# Response statis katalog (/api/symptoms, /api/rules)
+# Payload di-serialize sekali per revision knowledge base lalu disajikan
+# sebagai bytes dengan ETag, Cache-Control dan dukungan 304 Not Modified
+
+import gzip
+import hashlib
+import threading
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # brotli opsional, tanpa itu hanya gzip
+    brotli = None
+
+
+class CatalogPayload:
+    """Satu payload katalog yang sudah di-serialize (plus varian terkompresi)"""
+
+    def __init__(self, body):
+        self.body = body
+        self.tag = hashlib.sha256(body).hexdigest()[:32]
+        self.variants = {'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.variants['br'] = brotli.compress(body)
+
+    def tag_for(self, encoding):
+        """Strong ETag (tanpa quote) per representasi: beda encoding = beda ETag"""
+        if encoding is None:
+            return self.tag
+        return f'{self.tag}-{encoding}'
+
+
+class CatalogResponses:
+    """
+    Builder + cache response katalog
+    Payload dibangun ulang otomatis jika revision knowledge base berubah.
+    """
+
+    BUILDERS = {
+        'symptoms': 'build_symptoms',
+        'rules': 'build_rules'
+    }
+
+    def __init__(self, knowledge_base, json_provider, max_age=300):
+        self.kb = knowledge_base
+        self.json_provider = json_provider
+        self.max_age = max_age
+        self.revision = None
+        self._payloads = {}
+        self._lock = threading.Lock()
+
+    def build_symptoms(self):
+        symptoms = self.kb.get_all_symptoms()
+        return {
+            'success': True,
+            'data': symptoms,
+            'total': len(symptoms)
+        }
+
+    def build_rules(self):
+        formatted_rules = []
+
+        for rule_id, rule in self.kb.get_all_rules().items():
+            formatted_rules.append({
+                'rule_id': rule_id,
+                'conditions': list(rule.conditions),
+                'conclusion': rule.conclusion.to_dict()
+            })
+
+        return {
+            'success': True,
+            'data': formatted_rules,
+            'total': len(formatted_rules)
+        }
+
+    def get(self, name):
+        """Return CatalogPayload untuk revision knowledge base saat ini"""
+        revision = self.kb.revision
+        payloads = self._payloads
+        if self.revision == revision and name in payloads:
+            return payloads[name]
+
+        with self._lock:
+            if self.revision != revision:
+                self._payloads = {}
+                self.revision = revision
+            payload = self._payloads.get(name)
+            if payload is None:
+                data = getattr(self, self.BUILDERS[name])()
+                # Serialize persis seperti jsonify (provider JSON milik app)
+                payload = CatalogPayload(self.json_provider.response(data).get_data())
+                self._payloads[name] = payload
+            return payload
+
+    def response(self, name, request):
+        """
+        Bangun Response untuk request: pilih encoding dari Accept-Encoding,
+        dan balas 304 jika If-None-Match cocok dengan ETag
+        """
+        payload = self.get(name)
+
+        encoding = None
+        for candidate in ('br', 'gzip'):
+            if candidate in payload.variants and request.accept_encodings[candidate]:
+                encoding = candidate
+                break
+
+        tag = payload.tag_for(encoding)
+        headers = {
+            'ETag': f'"{tag}"',
+            'Cache-Control': f'public, max-age={self.max_age}, must-revalidate',
+            'Vary': 'Accept-Encoding'
+        }
+
+        # If-None-Match memakai weak comparison (RFC 9110)
+        if request.if_none_match.contains_weak(tag):
+            return Response(status=304, headers=headers)
+
+        body = payload.body
+        if encoding is not None:
+            body = payload.variants[encoding]
+            headers['Content-Encoding'] = encoding
+
+        return Response(body, mimetype='application/json', headers=headers)
@@ -0,0 +1,96 @@
+# Fragment penjelasan ter-compile untuk explain_diagnosis()
+# Deskripsi gejala, deskripsi kondisi dan tampilan conclusion setiap rule
+# dibangun sekali per revision knowledge base. Satu penjelasan cukup
+# merangkai referensi ke fragment ini, tanpa lookup deskripsi per kondisi.
+#
+# Fragment (tuple dan dict) dipakai bersama oleh semua response: read-only.
+
+from matching import confidence_of
+
+UNKNOWN_SYMPTOM = "Unknown symptom"
+
+
+class RuleFragment:
+    """
+    Fragment penjelasan satu rule
+    - conditions: tuple kode kondisi (urutan rule)
+    - descriptions: tuple deskripsi kondisi, urutan sama
+    - pairs: tuple (kode, deskripsi) untuk memisahkan matched / missing
+    - confidences: confidence (dibulatkan) per jumlah kondisi yang match
+    - view: dict diagnosis untuk diagnoses_found (rule_id + field conclusion)
+    """
+
+    __slots__ = ('conditions', 'descriptions', 'pairs', 'confidences', 'view')
+
+    def __init__(self, rule, describe):
+        total = len(rule.conditions)
+        self.conditions = rule.conditions
+        self.descriptions = tuple(describe(code) for code in rule.conditions)
+        self.pairs = tuple(zip(self.conditions, self.descriptions))
+        self.confidences = tuple(round(confidence_of(k, total), 2) for k in range(total + 1))
+        conclusion = rule.conclusion
+        self.view = {
+            'rule_id': rule.id,
+            'diagnosis': conclusion.diagnosis,
+            'category': conclusion.category,
+            'severity': conclusion.severity,
+            'description': conclusion.description,
+            'solutions': conclusion.solutions
+        }
+
+    def split(self, user_symptoms, matched_count):
+        """(deskripsi kondisi yang match, deskripsi yang tidak) untuk user_symptoms"""
+        total = len(self.conditions)
+        if matched_count == total:
+            return self.descriptions, ()
+        if matched_count == 0:
+            return (), self.descriptions
+        pairs = self.pairs
+        return (
+            [description for code, description in pairs if code in user_symptoms],
+            [description for code, description in pairs if code not in user_symptoms]
+        )
+
+
+class ExplanationFragments:
+    """
+    Fragment penjelasan untuk satu revision knowledge base
+
+    Deskripsi gejala/kondisi dihitung di awal (sebanyak jumlah kode).
+    Fragment per rule dibangun saat rule pertama kali dijelaskan, lalu
+    dipakai ulang sampai knowledge base di-reload (revision berubah).
+    """
+
+    def __init__(self, knowledge_base):
+        self.kb = knowledge_base
+        self.revision = knowledge_base.revision
+        self.descriptions = {code: knowledge_base.describe_condition(code) for code in knowledge_base.code_ids}
+        self.symptom_entries = {
+            code: {'code': code, 'description': description}
+            for code, description in knowledge_base.symptoms.items()
+        }
+        self._rules = [None] * len(knowledge_base.rule_list)
+
+    def describe(self, code):
+        """Deskripsi kondisi (sama dengan KnowledgeBase.describe_condition)"""
+        return self.descriptions.get(code, UNKNOWN_SYMPTOM)
+
+    def describe_all(self, codes):
+        descriptions = self.descriptions
+        return [descriptions.get(code, UNKNOWN_SYMPTOM) for code in codes]
+
+    def symptoms_provided(self, symptoms):
+        """List {'code', 'description'} untuk gejala input (kode tak dikenal: Unknown symptom)"""
+        entries = self.symptom_entries
+        return [
+            entries.get(code) or {'code': code, 'description': UNKNOWN_SYMPTOM}
+            for code in symptoms
+        ]
+
+    def rule(self, rule_id):
+        """RuleFragment untuk rule_id (dibangun sekali per revision)"""
+        position = self.kb.rules[rule_id].position
+        fragment = self._rules[position]
+        if fragment is None:
+            fragment = self._rules[position] = RuleFragment(self.kb.rule_list[position], self.describe)
+        return fragment
@@ -1,56 +1,63 @@
 # Forward Chaining Engine untuk Sistem Pakar
 # AI Agent untuk deteksi kerusakan laptop
 
-class ForwardChainingEngine:
+import heapq
+from contextlib import nullcontext
+
+from matching import MATCHERS, confidence_of
+from explanation import ExplanationFragments
+
+# Level trace inference:
+# - 'off': tanpa trace (hot path non-detailed)
+# - 'summary': hanya langkah utama (inisialisasi, adaptive threshold, terminasi)
+# - 'full': semua langkah termasuk setiap rule yang match/fire
+TRACE_LEVELS = ('off', 'summary', 'full')
+
+_NO_STAGE = nullcontext()
+
+class InferenceSession:
     """
-    Forward Chaining Inference Engine
-    Metode: Data-driven reasoning (dari fakta menuju kesimpulan)
-    
-    Algoritma:
-    1. Mulai dengan working memory (facts/gejala yang dipilih user)
-    2. Cari rules yang kondisinya match dengan working memory
-    3. Fire rule yang match (tambahkan conclusion ke working memory)
-    4. Repeat sampai tidak ada rule yang bisa di-fire
+    State untuk satu kali diagnosis (per-call)
+    Semua data yang berubah selama inference disimpan di sini, bukan di engine,
+    sehingga satu engine bisa dipakai bersamaan oleh banyak thread.
     """
     
-    def __init__(self, knowledge_base):
-        self.kb = knowledge_base
+    def __init__(self, trace_level='full'):
+        self.trace_level = trace_level
+        self.trace_summary = trace_level != 'off'
+        self.trace_full = trace_level == 'full'
         self.working_memory = set()  # Fakta yang diketahui
         self.fired_rules = []  # Rules yang sudah di-fire
         self.inferred_facts = []  # Kesimpulan yang didapat
         self.trace = []  # Trace untuk debugging/demonstrasi
         
-    def reset(self):
-        """Reset engine untuk diagnosis baru"""
-        self.working_memory = set()
-        self.fired_rules = []
-        self.inferred_facts = []
-        self.trace = []
-        
     def add_facts(self, facts):
         """
         Tambahkan fakta awal ke working memory
         facts: list of symptom codes (e.g., ['S01', 'S02'])
         """
         self.working_memory.update(facts)
-        self.trace.append({
-            'step': 'initialization',
-            'action': 'add_facts',
-            'facts': list(facts),
-            'working_memory': list(self.working_memory)
-        })
+        if self.trace_summary:
+            entry = {
+                'step': 'initialization',
+                'action': 'add_facts',
+                'facts': list(facts)
+            }
+            if self.trace_full:
+                entry['working_memory'] = list(self.working_memory)
+            self.trace.append(entry)
         
     def match_rule(self, rule_id, rule):
         """
         Cek apakah semua kondisi rule terpenuhi di working memory
         Return: True jika match, False jika tidak
         """
-        conditions = set(rule['conditions'])
-        return conditions.issubset(self.working_memory)
+        return self.working_memory.issuperset(rule['conditions'])
     
     def fire_rule(self, rule_id, rule):
         """
         Fire rule: tambahkan conclusion ke inferred facts
+        (fakta di conclusion['asserts'] ditambahkan ke working memory oleh engine)
         """
         conclusion = rule['conclusion']
         self.fired_rules.append(rule_id)
@@ -59,15 +66,102 @@ class ForwardChainingEngine:
             'diagnosis': conclusion
         })
         
-        self.trace.append({
+        if not self.trace_full:
+            return
+        entry = {
             'step': len(self.fired_rules),
             'action': 'fire_rule',
             'rule_id': rule_id,
             'conditions_met': rule['conditions'],
             'conclusion': conclusion['diagnosis']
-        })
+        }
+        if conclusion.get('asserts'):
+            entry['asserted'] = list(conclusion['asserts'])
+        self.trace.append(entry)
+
+
+class ForwardChainingEngine:
+    """
+    Forward Chaining Inference Engine
+    Metode: Data-driven reasoning (dari fakta menuju kesimpulan)
+    
+    Algoritma:
+    1. Mulai dengan working memory (facts/gejala yang dipilih user)
+    2. Cari rules yang kondisinya match dengan working memory
+    3. Fire rule yang match (tambahkan conclusion ke working memory)
+    4. Repeat sampai tidak ada rule yang bisa di-fire
+    
+    Engine bersifat stateless: setiap panggilan run() membuat InferenceSession
+    sendiri, jadi satu instance aman dipakai bersama oleh banyak thread.
+    
+    matcher memilih backend partial matching (lihat matching.MATCHERS):
+    - 'index': inverted index symptom -> rule (default)
+    - 'bitset': bitmask / matriks numpy, cocok untuk batch scoring
+    Output kedua backend identik.
+    
+    trace menentukan level trace default (lihat TRACE_LEVELS), bisa
+    di-override per panggilan run(). explain_diagnosis() selalu 'full'.
+    
+    metrics (opsional, metrics.Metrics) mencatat durasi tahap inference
+    ('match', 'rank', 'trace', 'chain', 'explain', 'lookup') dan counter kandidat.
+    
+    cache (opsional, cache.DiagnosisCache) menyimpan hasil run() dan
+    explain_diagnosis() per symptom set kanonik + parameter. Hasil tetap
+    sama dengan tanpa cache: urutan gejala input (symptoms_provided, trace
+    inisialisasi) mengikuti pemanggil, dan jumlah gejala termasuk duplikat
+    (total_symptoms, adaptive threshold) ikut menjadi bagian key.
+    
+    lookup (opsional, lookup_table.LookupTable) berisi hasil partial matching
+    yang dihitung offline untuk kombinasi gejala kecil. run() tanpa trace
+    'full' untuk kombinasi + threshold/top_n yang tercakup diambil dari tabel
+    (O(1)), tanpa matching; hasilnya identik.
+    """
+    
+    def __init__(self, knowledge_base, matcher='index', cache=None, trace='full', metrics=None, lookup=None):
+        if matcher not in MATCHERS:
+            raise ValueError(f"Unknown matcher '{matcher}', choose from {sorted(MATCHERS)}")
+        if trace not in TRACE_LEVELS:
+            raise ValueError(f"Unknown trace level '{trace}', choose from {list(TRACE_LEVELS)}")
+        self.kb = knowledge_base
+        self.matcher_name = matcher
+        self._matcher = None
+        self._fragments = None
+        self.cache = cache
+        self.trace_level = trace
+        self.metrics = metrics
+        self.lookup = lookup
         
-    def run(self, symptoms, threshold=60, top_n=5, strict_mode=False):
+    def _stage(self, name):
+        """Context manager pengukur durasi tahap (no-op tanpa metrics)"""
+        if self.metrics is None:
+            return _NO_STAGE
+        return self.metrics.stage(name)
+    
+    @property
+    def matcher(self):
+        """Matcher ter-compile untuk revision knowledge base saat ini"""
+        matcher = self._matcher
+        if matcher is None or matcher.revision != self.kb.revision:
+            matcher = MATCHERS[self.matcher_name](self.kb)
+            self._matcher = matcher
+        return matcher
+    
+    @property
+    def fragments(self):
+        """Fragment penjelasan (explanation.ExplanationFragments) untuk revision saat ini"""
+        fragments = self._fragments
+        if fragments is None or fragments.revision != self.kb.revision:
+            fragments = ExplanationFragments(self.kb)
+            self._fragments = fragments
+        return fragments
+        
+    def new_session(self, symptoms, trace='full'):
+        """Buat InferenceSession baru yang sudah berisi fakta awal"""
+        session = InferenceSession(trace)
+        session.add_facts(symptoms)
+        return session
+        
+    def run(self, symptoms, threshold=60, top_n=5, strict_mode=False, trace=None):
         """
         Jalankan forward chaining engine dengan partial matching
         
@@ -76,6 +170,7 @@ class ForwardChainingEngine:
             threshold: minimum confidence percentage untuk menampilkan hasil (default 60%)
             top_n: jumlah maksimal hasil yang ditampilkan (default 5)
             strict_mode: jika True, hanya tampilkan match 100% (default False)
+            trace: level trace ('off' / 'summary' / 'full'), default level engine
             
         Returns:
             dict: {
@@ -86,214 +181,460 @@ class ForwardChainingEngine:
                 'total_candidates': jumlah total kandidat yang ditemukan
             }
         """
-        self.reset()
-        self.add_facts(symptoms)
+        trace = trace or self.trace_level
+        if trace not in TRACE_LEVELS:
+            raise ValueError(f"Unknown trace level '{trace}', choose from {list(TRACE_LEVELS)}")
+        if self.cache is not None:
+            return self._cached(self._run, symptoms, threshold, top_n, strict_mode, False, trace)
+        return self._run(symptoms, threshold, top_n, strict_mode, trace)
+    
+    def _cached(self, compute, symptoms, threshold, top_n, strict_mode, detailed, trace):
+        """
+        Ambil hasil dari cache, atau hitung dengan gejala pemanggil lalu simpan
+        Key memakai symptom set kanonik; entry menyimpan urutan input yang
+        menghasilkannya, dan bagian hasil yang mengikuti urutan input
+        disesuaikan ulang jika pemanggil memakai urutan lain.
+        """
+        key = self.cache.make_key(symptoms, threshold, top_n, strict_mode, detailed, trace)
+        revision = self.kb.revision
+        symptoms = list(symptoms)
+        entry = self.cache.get(key, revision)
+        if entry is None:
+            result = compute(symptoms, threshold, top_n, strict_mode, trace)
+            self.cache.put(key, (symptoms, result), revision)
+            return result
+        cached_symptoms, result = entry
+        if cached_symptoms != symptoms:
+            result = self._with_input_order(result, symptoms, detailed)
+        return result
+    
+    def _with_input_order(self, result, symptoms, detailed):
+        """
+        Salinan hasil ter-cache dengan field yang mengikuti urutan input:
+        symptoms_provided (explain_diagnosis), atau fakta awal di trace dan
+        working memory partial matching (run)
+        """
+        if detailed:
+            return dict(result, symptoms_provided=self._symptoms_provided(symptoms))
+        result = dict(result)
+        working_memory = list(set(symptoms))  # urutan sama dengan InferenceSession.add_facts
+        if not result['strict_mode']:
+            result['working_memory'] = working_memory
+        trace = result['trace']
+        if trace and trace[0]['action'] == 'add_facts':
+            entry = dict(trace[0], facts=symptoms)
+            if 'working_memory' in entry:
+                entry['working_memory'] = working_memory
+            result['trace'] = [entry, *trace[1:]]
+        return result
+    
+    def _run(self, symptoms, threshold, top_n, strict_mode, trace):
+        session = self.new_session(symptoms, trace)
         
         # Jika strict mode, gunakan algoritma lama (100% match only)
         if strict_mode:
-            return self._run_strict_mode(symptoms)
+            with self._stage('chain'):
+                return self._run_strict_mode(session)
         
-        # Adaptive threshold: jika hanya 1-2 gejala, turunkan threshold
-        adaptive_threshold = threshold
-        if len(symptoms) <= 1:
-            adaptive_threshold = min(threshold, 30)  # Max 30% untuk 1 gejala (show more results)
-            self.trace.append({
-                'step': 'adaptive_threshold',
-                'action': 'threshold_adjusted',
-                'original_threshold': threshold,
-                'new_threshold': adaptive_threshold,
-                'reason': 'Single symptom selected - showing more possibilities'
-            })
-        elif len(symptoms) == 2:
-            adaptive_threshold = min(threshold, 45)  # Max 45% untuk 2 gejala
-            self.trace.append({
-                'step': 'adaptive_threshold',
-                'action': 'threshold_adjusted',
-                'original_threshold': threshold,
-                'new_threshold': adaptive_threshold,
-                'reason': 'Two symptoms selected - relaxed threshold'
-            })
+        adaptive_threshold = self._adaptive_threshold(session, symptoms, threshold)
+        user_symptoms = set(symptoms)
+        
+        hit = self._lookup(session, symptoms, threshold, top_n)
+        if hit is not None:
+            total_candidates, selected = hit
+            return self._partial_result(session, user_symptoms, selected, total_candidates, threshold, adaptive_threshold)
         
         # Partial matching: kumpulkan semua kandidat dengan confidence >= threshold
-        candidates = []
+        with self._stage('match'):
+            matches = self.matcher.candidates(user_symptoms, adaptive_threshold)
+        return self._run_partial(session, user_symptoms, matches, threshold, adaptive_threshold, top_n)
+    
+    def run_batch(self, requests):
+        """
+        Jalankan banyak diagnosis sekaligus
+        Semua request partial matching di-score bersama lewat
+        matcher.batch_candidates (satu perkalian matriks untuk matcher 'bitset').
         
-        for rule_id, rule in self.kb.get_all_rules().items():
-            conditions = set(rule['conditions'])
-            user_symptoms = set(symptoms)
-            
-            # Hitung matched dan missing symptoms
-            matched_symptoms = conditions.intersection(user_symptoms)
-            missing_symptoms = conditions.difference(user_symptoms)
-            
-            # Hitung confidence score
-            if len(conditions) > 0:
-                confidence = (len(matched_symptoms) / len(conditions)) * 100
-            else:
-                confidence = 0
+        Args:
+            requests: list of dict dengan key 'symptoms' dan opsional
+                      'threshold', 'top_n', 'strict_mode', 'trace' (default sama dengan run())
             
-            # Tambahkan ke kandidat jika memenuhi threshold
-            if confidence >= adaptive_threshold:
-                candidates.append({
-                    'rule_id': rule_id,
-                    'confidence': round(confidence, 2),
-                    'diagnosis': rule['conclusion'],
-                    'matched_symptoms': list(matched_symptoms),
-                    'missing_symptoms': list(missing_symptoms),
-                    'total_conditions': len(conditions),
-                    'matched_count': len(matched_symptoms)
+        Returns:
+            list hasil run(), urut sesuai requests
+        """
+        results = [None] * len(requests)
+        pending = []
+        
+        for i, req in enumerate(requests):
+            symptoms = req['symptoms']
+            session = self.new_session(symptoms, req.get('trace') or self.trace_level)
+            if req.get('strict_mode', False):
+                with self._stage('chain'):
+                    results[i] = self._run_strict_mode(session)
+                continue
+            threshold = req.get('threshold', 60)
+            top_n = req.get('top_n', 5)
+            adaptive_threshold = self._adaptive_threshold(session, symptoms, threshold)
+            hit = self._lookup(session, symptoms, threshold, top_n)
+            if hit is not None:
+                total_candidates, selected = hit
+                results[i] = self._partial_result(
+                    session, set(symptoms), selected, total_candidates, threshold, adaptive_threshold
+                )
+                continue
+            pending.append((i, session, set(symptoms), threshold, adaptive_threshold, top_n))
+        
+        with self._stage('match_batch'):
+            all_matches = self.matcher.batch_candidates(
+                [p[2] for p in pending],
+                [p[4] for p in pending]
+            )
+        for (i, session, user_symptoms, threshold, adaptive_threshold, top_n), matches in zip(pending, all_matches):
+            results[i] = self._run_partial(session, user_symptoms, matches, threshold, adaptive_threshold, top_n)
+        
+        return results
+    
+    def _lookup(self, session, symptoms, threshold, top_n):
+        """(total_candidates, selected) dari tabel lookup, atau None jika tidak tercakup"""
+        if self.lookup is None or session.trace_full:
+            return None
+        with self._stage('lookup'):
+            hit = self.lookup.get(self.kb, symptoms, threshold, top_n)
+        if hit is not None and self.metrics is not None:
+            self.metrics.inc('lookup_hits')
+        return hit
+    
+    def _adaptive_threshold(self, session, symptoms, threshold):
+        """
+        Adaptive threshold: jika hanya 1-2 gejala, turunkan threshold
+        """
+        adaptive_threshold = threshold
+        if len(symptoms) <= 1:
+            adaptive_threshold = min(threshold, 30)  # Max 30% untuk 1 gejala (show more results)
+            if session.trace_summary:
+                session.trace.append({
+                    'step': 'adaptive_threshold',
+                    'action': 'threshold_adjusted',
+                    'original_threshold': threshold,
+                    'new_threshold': adaptive_threshold,
+                    'reason': 'Single symptom selected - showing more possibilities'
                 })
-                
-                # Tambahkan ke trace
-                self.trace.append({
-                    'step': len(candidates),
-                    'action': 'partial_match',
-                    'rule_id': rule_id,
-                    'confidence': round(confidence, 2),
-                    'matched': list(matched_symptoms),
-                    'missing': list(missing_symptoms)
+        elif len(symptoms) == 2:
+            adaptive_threshold = min(threshold, 45)  # Max 45% untuk 2 gejala
+            if session.trace_summary:
+                session.trace.append({
+                    'step': 'adaptive_threshold',
+                    'action': 'threshold_adjusted',
+                    'original_threshold': threshold,
+                    'new_threshold': adaptive_threshold,
+                    'reason': 'Two symptoms selected - relaxed threshold'
                 })
+        return adaptive_threshold
+    
+    def _run_partial(self, session, user_symptoms, matches, threshold, adaptive_threshold, top_n):
+        """
+        Selesaikan partial matching dari hasil matcher: ranking, top N dan trace
+        """
+        # Trace full butuh entry untuk setiap kandidat (urut knowledge base)
+        if session.trace_full:
+            with self._stage('trace'):
+                self._trace_candidates(session, user_symptoms, matches)
         
-        # Sort by confidence descending
-        candidates.sort(key=lambda x: x['confidence'], reverse=True)
+        with self._stage('rank'):
+            selected = self._rank(matches, top_n)
+        return self._partial_result(session, user_symptoms, selected, len(matches), threshold, adaptive_threshold)
+    
+    def _partial_result(self, session, user_symptoms, selected, total_candidates, threshold, adaptive_threshold):
+        """
+        Hasil partial matching dari kandidat teratas (format _rank())
+        total_candidates = jumlah semua kandidat yang lolos threshold
+        """
+        top_candidates = [
+            self._build_candidate(rule_id, -neg_confidence, matched_count, user_symptoms)
+            for neg_confidence, _, rule_id, matched_count in selected
+        ]
         
-        # Ambil top N hasil
-        top_candidates = candidates[:top_n]
+        if self.metrics is not None:
+            self.metrics.inc('candidates', total_candidates)
+            self.metrics.inc('diagnoses_returned', len(top_candidates))
         
         # Mark rules as fired untuk konsistensi
         for candidate in top_candidates:
-            self.fired_rules.append(candidate['rule_id'])
-            self.inferred_facts.append({
+            session.fired_rules.append(candidate['rule_id'])
+            session.inferred_facts.append({
                 'rule_id': candidate['rule_id'],
                 'diagnosis': candidate['diagnosis'],
                 'confidence': candidate['confidence']
             })
         
-        self.trace.append({
-            'step': 'termination',
-            'action': 'partial_matching_complete',
-            'message': f'Found {len(candidates)} candidates, returning top {len(top_candidates)}',
-            'threshold_used': adaptive_threshold,
-            'original_threshold': threshold,
-            'adaptive_mode': adaptive_threshold != threshold
-        })
+        if session.trace_summary:
+            session.trace.append({
+                'step': 'termination',
+                'action': 'partial_matching_complete',
+                'message': f'Found {total_candidates} candidates, returning top {len(top_candidates)}',
+                'threshold_used': adaptive_threshold,
+                'original_threshold': threshold,
+                'adaptive_mode': adaptive_threshold != threshold
+            })
         
         return {
             'diagnoses': top_candidates,
-            'trace': self.trace,
-            'fired_rules': self.fired_rules,
-            'working_memory': list(self.working_memory),
-            'total_candidates': len(candidates),
+            'trace': session.trace,
+            'fired_rules': session.fired_rules,
+            'working_memory': list(session.working_memory),
+            'total_candidates': total_candidates,
             'threshold_used': adaptive_threshold,
             'original_threshold': threshold,
             'adaptive_mode': adaptive_threshold != threshold,
             'strict_mode': False
         }
     
-    def _run_strict_mode(self, symptoms):
+    def _trace_candidates(self, session, user_symptoms, matches):
+        """Tambahkan entry trace 'partial_match' untuk setiap kandidat"""
+        session.trace.extend(self._candidate_entries(user_symptoms, matches))
+    
+    def _candidate_entries(self, user_symptoms, matches):
+        """Generator entry trace 'partial_match' (dibangun satu per satu)"""
+        rules = self.kb.rules
+        for step, (rule_id, matched_count) in enumerate(matches, 1):
+            confidence = round(confidence_of(matched_count, len(rules[rule_id].conditions)), 2)
+            matched_symptoms, missing_symptoms = self._split_conditions(rule_id, user_symptoms)
+            yield {
+                'step': step,
+                'action': 'partial_match',
+                'rule_id': rule_id,
+                'confidence': confidence,
+                'matched': matched_symptoms,
+                'missing': missing_symptoms
+            }
+    
+    def _rank(self, matches, top_n):
         """
-        Algoritma strict mode (100% match only) - backward compatibility
+        Top N kandidat sebagai tuple (-confidence, position, rule_id, matched_count)
+        tanpa membangun dict diagnosis
         """
-        # Forward chaining loop
-        iteration = 0
-        max_iterations = 100
+        rules = self.kb.rules
+        
+        # Ranking: confidence descending, seri diurutkan sesuai urutan knowledge base
+        ranked = (
+            (-round(confidence_of(matched_count, len(rules[rule_id].conditions)), 2), position, rule_id, matched_count)
+            for position, (rule_id, matched_count) in enumerate(matches)
+        )
+        
+        # Ambil top N hasil: bounded heap, kandidat di bawah lantai heap
+        # dilewati tanpa membangun dict
+        if isinstance(top_n, int) and 0 <= top_n < len(matches):
+            return heapq.nsmallest(top_n, ranked)
+        return sorted(ranked)[:top_n]
+    
+    def _split_conditions(self, rule_id, user_symptoms):
+        """Pisahkan kondisi rule menjadi (matched, missing) sesuai urutan kondisi"""
+        conditions = self.kb.rules[rule_id].conditions
+        matched_symptoms = [c for c in conditions if c in user_symptoms]
+        missing_symptoms = [c for c in conditions if c not in user_symptoms]
+        return matched_symptoms, missing_symptoms
+    
+    def _build_candidate(self, rule_id, confidence, matched_count, user_symptoms):
+        """Bangun dict kandidat diagnosis untuk satu rule"""
+        rule = self.kb.rules[rule_id]
+        matched_symptoms, missing_symptoms = self._split_conditions(rule_id, user_symptoms)
+        return {
+            'rule_id': rule_id,
+            'confidence': confidence,
+            'diagnosis': rule.conclusion,
+            'matched_symptoms': matched_symptoms,
+            'missing_symptoms': missing_symptoms,
+            'total_conditions': len(rule.conditions),
+            'matched_count': matched_count
+        }
+    
+    def _run_strict_mode(self, session, max_iterations=100):
+        """
+        Strict mode (100% match only): forward chaining multi-step dengan agenda
         
-        while iteration < max_iterations:
-            iteration += 1
-            rules_fired_this_iteration = False
+        - Matching incremental (TREAT-style): setiap rule menyimpan jumlah
+          kondisi yang sudah terpenuhi. Fakta baru hanya mengevaluasi ulang rules
+          yang memakai fakta tsb (lewat inverted index), tanpa scan ulang semua rule.
+        - Rule yang semua kondisinya terpenuhi masuk agenda. Conflict resolution:
+          siklus lebih awal dulu, lalu salience lebih tinggi, lalu urutan rule.
+        - Fire rule menambahkan fakta di conclusion['asserts'] ke working memory,
+          sehingga rules lain bisa di-chain (mis. "power subsystem fault" -> komponen).
+        - Refraction: setiap rule hanya fire sekali.
+        
+        total_iterations = jumlah siklus recognize-act (termasuk siklus terakhir
+        yang tidak menemukan rule baru).
+        """
+        rule_list = self.kb.rule_list
+        satisfied = {}  # position rule -> jumlah kondisi yang sudah ada di working memory
+        agenda = []
+        
+        for position in self.kb.unconditional_rules:
+            self._activate(agenda, 1, position)
+        self._propagate_facts(session.working_memory, satisfied, agenda, 1)
+        
+        iteration = 0
+        while agenda:
+            cycle, _, position, rule_id = heapq.heappop(agenda)
+            if cycle > max_iterations:
+                break
+            iteration = cycle
             
-            for rule_id, rule in self.kb.get_all_rules().items():
-                if rule_id in self.fired_rules:
-                    continue
-                    
-                if self.match_rule(rule_id, rule):
-                    self.fire_rule(rule_id, rule)
-                    rules_fired_this_iteration = True
+            rule = rule_list[position]
+            session.fire_rule(rule_id, rule)
             
-            if not rules_fired_this_iteration:
-                self.trace.append({
-                    'step': 'termination',
-                    'action': 'no_more_rules',
-                    'message': 'No more rules to fire. Forward chaining complete.'
-                })
-                break
+            # Chaining: fakta hasil conclusion memicu rules yang bergantung padanya
+            # Setiap fakta hanya dipropagasi sekali (asserts bisa berisi duplikat
+            # atau fakta yang sudah ada), jadi jumlah kondisi terpenuhi tidak dobel
+            new_facts = []
+            for fact in rule.conclusion.asserts:
+                if fact not in session.working_memory:
+                    session.working_memory.add(fact)
+                    new_facts.append(fact)
+            if new_facts:
+                self._propagate_facts(new_facts, satisfied, agenda, cycle + 1)
+        
+        if self.metrics is not None:
+            self.metrics.inc('rules_fired', len(session.fired_rules))
+        
+        if session.trace_summary:
+            session.trace.append({
+                'step': 'termination',
+                'action': 'no_more_rules',
+                'message': 'No more rules to fire. Forward chaining complete.'
+            })
         
         return {
-            'diagnoses': self.inferred_facts,
-            'trace': self.trace,
-            'fired_rules': self.fired_rules,
-            'working_memory': list(self.working_memory),
-            'total_iterations': iteration,
+            'diagnoses': session.inferred_facts,
+            'trace': session.trace,
+            'fired_rules': session.fired_rules,
+            'working_memory': list(session.working_memory),
+            'total_iterations': iteration + 1,
             'strict_mode': True
         }
     
+    def _propagate_facts(self, facts, satisfied, agenda, cycle):
+        """Update jumlah kondisi terpenuhi untuk rules yang memakai facts"""
+        postings = self.kb.postings
+        totals = self.kb.condition_totals
+        for fact in facts:
+            for position in postings.get(fact, ()):
+                count = satisfied.get(position, 0) + 1
+                satisfied[position] = count
+                if count == totals[position]:
+                    self._activate(agenda, cycle, position)
+    
+    def _activate(self, agenda, cycle, position):
+        """Masukkan rule ke agenda dengan prioritas conflict resolution"""
+        rule = self.kb.rule_list[position]
+        heapq.heappush(agenda, (cycle, -rule.salience, position, rule.id))
+    
     def explain_diagnosis(self, symptoms, threshold=60, top_n=5, strict_mode=False):
         """
         Jalankan diagnosis dan berikan penjelasan lengkap dengan confidence score
         """
-        result = self.run(symptoms, threshold=threshold, top_n=top_n, strict_mode=strict_mode)
+        if self.cache is not None:
+            return self._cached(self._explain_diagnosis, symptoms, threshold, top_n, strict_mode, True, 'full')
+        return self._explain_diagnosis(symptoms, threshold, top_n, strict_mode, 'full')
+    
+    def _explain_diagnosis(self, symptoms, threshold, top_n, strict_mode, trace):
+        if strict_mode:
+            result = self._run(symptoms, threshold, top_n, strict_mode, trace)
+            return self.explain_result(result, symptoms, strict_mode=strict_mode)
         
+        # Partial matching: reasoning step dibangun langsung dari kandidat,
+        # tanpa trace 'partial_match' per kandidat sebagai perantara
+        session = self.new_session(symptoms, 'off')
+        adaptive_threshold = self._adaptive_threshold(session, symptoms, threshold)
+        user_symptoms = set(symptoms)
+        with self._stage('match'):
+            matches = self.matcher.candidates(user_symptoms, adaptive_threshold)
+        result = self._run_partial(session, user_symptoms, matches, threshold, adaptive_threshold, top_n)
+        with self._stage('explain'):
+            explanation = self._format_explanation(result, symptoms, strict_mode)
+            explanation['reasoning_steps'] = list(self._explain_matches(user_symptoms, matches))
+        return explanation
+    
+    def explain_result(self, result, symptoms, strict_mode=False):
+        """
+        Format hasil run() menjadi penjelasan lengkap yang user-friendly
+        """
+        with self._stage('explain'):
+            return self._format_explanation(result, symptoms, strict_mode)
+    
+    def _format_explanation(self, result, symptoms, strict_mode):
         # Format output yang user-friendly
-        explanation = {
-            'symptoms_provided': [
-                {
-                    'code': s,
-                    'description': self.kb.get_symptom_description(s)
-                } for s in symptoms
+        return {
+            'symptoms_provided': self._symptoms_provided(symptoms),
+            'diagnoses_found': [
+                self._explain_candidate(diag, strict_mode) for diag in result['diagnoses']
+            ],
+            'reasoning_steps': [
+                self._explain_step(trace_item) for trace_item in result['trace']
+                if trace_item['action'] in ('fire_rule', 'partial_match')
             ],
-            'diagnoses_found': [],
-            'reasoning_steps': [],
-            'summary': {}
+            'summary': self._explanation_summary(result, symptoms)
+        }
+    
+    def _symptoms_provided(self, symptoms):
+        return self.fragments.symptoms_provided(symptoms)
+    
+    def _explain_candidate(self, diag, strict_mode):
+        """
+        Format satu diagnosis dengan confidence score
+        Field diagnosis diambil dari view conclusion yang sudah dibangun
+        (strict mode: view itu sendiri, read-only)
+        """
+        view = self.fragments.rule(diag['rule_id']).view
+        if strict_mode:
+            return view
+        
+        # Tambahkan confidence info jika bukan strict mode
+        diagnosis_info = dict(view)
+        diagnosis_info['confidence'] = diag.get('confidence', 100)
+        diagnosis_info['matched_symptoms'] = diag.get('matched_symptoms', [])
+        diagnosis_info['missing_symptoms'] = diag.get('missing_symptoms', [])
+        diagnosis_info['match_ratio'] = f"{diag.get('matched_count', 0)}/{diag.get('total_conditions', 0)}"
+        return diagnosis_info
+    
+    def _explain_step(self, trace_item):
+        """Format satu entry trace 'fire_rule' / 'partial_match' menjadi reasoning step"""
+        step_info = {
+            'step': trace_item['step'],
+            'rule_fired': trace_item['rule_id'],
         }
         
-        # Format diagnoses dengan confidence score
-        for diag in result['diagnoses']:
-            diagnosis_info = {
-                'rule_id': diag['rule_id'],
-                'diagnosis': diag['diagnosis']['diagnosis'],
-                'category': diag['diagnosis']['category'],
-                'severity': diag['diagnosis']['severity'],
-                'description': diag['diagnosis']['description'],
-                'solutions': diag['diagnosis']['solutions']
+        fragments = self.fragments
+        if trace_item['action'] == 'partial_match':
+            step_info['confidence'] = trace_item['confidence']
+            step_info['matched_symptoms'] = fragments.describe_all(trace_item['matched'])
+            step_info['missing_symptoms'] = fragments.describe_all(trace_item['missing'])
+        else:
+            step_info['conditions_met'] = fragments.rule(trace_item['rule_id']).descriptions
+            step_info['conclusion'] = trace_item['conclusion']
+        
+        return step_info
+    
+    def _explain_matches(self, user_symptoms, matches):
+        """
+        Generator reasoning step untuk setiap kandidat partial matching
+        Sama dengan _explain_step() dari entry trace 'partial_match', tetapi
+        deskripsi kondisi diambil dari fragment rule (match penuh / nol
+        memakai tuple deskripsi yang sama untuk semua request)
+        """
+        fragments = self.fragments
+        for step, (rule_id, matched_count) in enumerate(matches, 1):
+            fragment = fragments.rule(rule_id)
+            matched, missing = fragment.split(user_symptoms, matched_count)
+            yield {
+                'step': step,
+                'rule_fired': rule_id,
+                'confidence': fragment.confidences[matched_count],
+                'matched_symptoms': matched,
+                'missing_symptoms': missing
             }
-            
-            # Tambahkan confidence info jika bukan strict mode
-            if not strict_mode:
-                diagnosis_info['confidence'] = diag.get('confidence', 100)
-                diagnosis_info['matched_symptoms'] = diag.get('matched_symptoms', [])
-                diagnosis_info['missing_symptoms'] = diag.get('missing_symptoms', [])
-                diagnosis_info['match_ratio'] = f"{diag.get('matched_count', 0)}/{diag.get('total_conditions', 0)}"
-            
-            explanation['diagnoses_found'].append(diagnosis_info)
-        
-        # Format reasoning steps
-        for trace_item in result['trace']:
-            if trace_item['action'] in ['fire_rule', 'partial_match']:
-                step_info = {
-                    'step': trace_item['step'],
-                    'rule_fired': trace_item['rule_id'],
-                }
-                
-                if trace_item['action'] == 'partial_match':
-                    step_info['confidence'] = trace_item['confidence']
-                    step_info['matched_symptoms'] = [
-                        self.kb.get_symptom_description(c) 
-                        for c in trace_item['matched']
-                    ]
-                    step_info['missing_symptoms'] = [
-                        self.kb.get_symptom_description(c) 
-                        for c in trace_item['missing']
-                    ]
-                else:
-                    step_info['conditions_met'] = [
-                        self.kb.get_symptom_description(c) 
-                        for c in trace_item['conditions_met']
-                    ]
-                    step_info['conclusion'] = trace_item['conclusion']
-                
-                explanation['reasoning_steps'].append(step_info)
-        
-        # Summary
-        explanation['summary'] = {
+    
+    def _explanation_summary(self, result, symptoms):
+        return {
             'total_symptoms': len(symptoms),
             'total_diagnoses': len(result['diagnoses']),
             'rules_fired': len(result['fired_rules']),
@@ -303,8 +644,68 @@ class ForwardChainingEngine:
             'adaptive_mode': result.get('adaptive_mode', False),
             'strict_mode': result.get('strict_mode', False)
         }
+    
+    def iter_diagnosis(self, symptoms, threshold=60, top_n=5, strict_mode=False, detailed=True):
+        """
+        Versi streaming dari explain_diagnosis() / run(): generator event (type, data)
         
-        return explanation
+        - ('symptoms', symptoms_provided)             hanya jika detailed
+        - ('diagnosis', diagnosis)                    per diagnosis, urut ranking
+        - ('step', reasoning_step)                    per reasoning step, hanya jika detailed
+        - ('summary', summary)                        terakhir
+        
+        Data setiap event sama dengan bagian yang bersesuaian di output
+        explain_diagnosis() (detailed) atau run() / format non-detailed di API.
+        Di partial matching, trace per kandidat tidak disimpan: reasoning step
+        dibangun satu per satu dari daftar kandidat saat event dikonsumsi,
+        jadi memori tidak tumbuh dengan jumlah kandidat. Tidak memakai cache.
+        """
+        if detailed:
+            yield 'symptoms', self._symptoms_provided(symptoms)
+        
+        if strict_mode:
+            # Hasil strict mode dibatasi jumlah rule yang fire; hitung biasa lalu kirim per bagian
+            session = self.new_session(symptoms, 'full' if detailed else 'off')
+            with self._stage('chain'):
+                result = self._run_strict_mode(session)
+            for diag in result['diagnoses']:
+                yield 'diagnosis', self._explain_candidate(diag, True) if detailed else diag
+            if detailed:
+                for trace_item in result['trace']:
+                    if trace_item['action'] == 'fire_rule':
+                        yield 'step', self._explain_step(trace_item)
+                yield 'summary', self._explanation_summary(result, symptoms)
+            else:
+                yield 'summary', {'total_candidates': 0, 'threshold_used': threshold}
+            return
+        
+        session = self.new_session(symptoms, 'off')
+        adaptive_threshold = self._adaptive_threshold(session, symptoms, threshold)
+        user_symptoms = set(symptoms)
+        with self._stage('match'):
+            matches = self.matcher.candidates(user_symptoms, adaptive_threshold)
+        with self._stage('rank'):
+            selected = self._rank(matches, top_n)
+        
+        for neg_confidence, _, rule_id, matched_count in selected:
+            candidate = self._build_candidate(rule_id, -neg_confidence, matched_count, user_symptoms)
+            yield 'diagnosis', self._explain_candidate(candidate, False) if detailed else candidate
+        
+        if not detailed:
+            yield 'summary', {'total_candidates': len(matches), 'threshold_used': adaptive_threshold}
+            return
+        
+        for step in self._explain_matches(user_symptoms, matches):
+            yield 'step', step
+        yield 'summary', self._explanation_summary({
+            'diagnoses': selected,
+            'fired_rules': selected,
+            'total_candidates': len(matches),
+            'threshold_used': adaptive_threshold,
+            'original_threshold': threshold,
+            'adaptive_mode': adaptive_threshold != threshold,
+            'strict_mode': False
+        }, symptoms)
     
     def get_confidence_score(self, diagnosis, symptoms):
         """
@@ -315,9 +716,8 @@ class ForwardChainingEngine:
             return 0
         
         rule_id = diagnosis['rule_id']
-        rule = self.kb.get_all_rules()[rule_id]
-        conditions = set(rule['conditions'])
-        matched = conditions.intersection(set(symptoms))
+        conditions = self.kb.rules[rule_id].conditions
+        matched = set(conditions).intersection(symptoms)
         
         confidence = (len(matched) / len(conditions)) * 100
         return round(confidence, 2)
@@ -0,0 +1,54 @@
+# Konfigurasi gunicorn untuk production
+# gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Environment:
+#   PORT               port (default 5000)
+#   WEB_CONCURRENCY    jumlah worker process (default: jumlah CPU)
+#   GUNICORN_THREADS   thread per worker (default 4)
+#   GUNICORN_TIMEOUT   timeout request dalam detik (default 30)
+#   GRACEFUL_TIMEOUT   waktu menyelesaikan request saat shutdown (default 20)
+
+import gc
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', 20))
+keepalive = 5
+
+# Load app (knowledge base + index + matcher + katalog) sekali di master
+# sebelum fork, supaya semua worker berbagi memori secara copy-on-write
+preload_app = True
+
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    # Pindahkan objek hasil preload ke generasi permanen GC, supaya GC di
+    # worker tidak menyentuh (dan meng-copy) halaman memori yang dibagi
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    # Setelah init_process() memasang signal handler worker (yang me-reset
+    # SIGHUP ke default), jadi handler reload SIGHUP dan drain SIGTERM
+    # dipasang di sini, bukan di post_fork
+    from wsgi import start_background_tasks
+    start_background_tasks()
+
+
+def worker_int(worker):
+    # SIGINT/SIGQUIT (shutdown cepat); SIGTERM ditangani install_drain_handler
+    from wsgi import mark_draining
+    mark_draining()
+
+
+def worker_exit(server, worker):
+    # Di process worker, setelah request terakhir selesai: flush log request
+    from wsgi import stop_background_tasks
+    stop_background_tasks()
@@ -0,0 +1,105 @@
+# JSON provider untuk Flask app
+# Encoder cepat (orjson) dipakai jika terpasang, fallback ke stdlib json.
+# Keduanya menghasilkan JSON compact (tanpa indent/spasi) dan ikut
+# men-serialize Rule/Conclusion dari knowledge base lewat json_default.
+#
+# Environment:
+#   JSON_ENCODER  auto (default) | orjson | stdlib
+#   JSON_PRETTY   1 = output ber-indent (untuk debugging)
+
+import os
+
+from flask.json.provider import DefaultJSONProvider
+
+from knowledge_base import json_default
+
+try:
+    import orjson
+except ImportError:  # orjson opsional, tanpa itu dipakai stdlib json
+    orjson = None
+
+
+class KnowledgeBaseJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider (stdlib json) yang juga men-serialize Rule/Conclusion
+    Hasil engine memakai objek compact dari knowledge base; dict JSON baru
+    dibuat di sini, saat response di-serialize.
+    """
+
+    name = 'stdlib'
+    compact = True
+
+    @staticmethod
+    def default(o):
+        try:
+            return json_default(o)
+        except TypeError:
+            return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj, **kwargs):
+        # dumps() langsung (mis. event streaming) juga compact, seperti response()
+        if self.compact:
+            kwargs.setdefault('separators', (',', ':'))
+        return super().dumps(obj, **kwargs)
+
+
+class OrjsonProvider(KnowledgeBaseJSONProvider):
+    """
+    JSON provider berbasis orjson (encoder C, langsung ke bytes)
+
+    Output setara dengan KnowledgeBaseJSONProvider: key diurutkan (sort_keys),
+    key non-string diizinkan, datetime/date lewat default() Flask (HTTP date).
+    Bedanya, karakter non-ASCII ditulis sebagai UTF-8, bukan escape \\uXXXX.
+    Pemanggilan dengan argumen tambahan (mis. indent=...) diteruskan ke stdlib.
+    """
+
+    name = 'orjson'
+
+    def _option(self):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps_bytes(self, obj):
+        return orjson.dumps(obj, default=self.default, option=self._option())
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Body bytes langsung dari orjson, tanpa decode/encode str
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
+
+
+JSON_PROVIDERS = {
+    'stdlib': KnowledgeBaseJSONProvider,
+}
+if orjson is not None:
+    JSON_PROVIDERS['orjson'] = OrjsonProvider
+
+
+def create_json_provider(app, encoder=None):
+    """
+    JSON provider untuk app sesuai JSON_ENCODER
+    'auto': orjson jika terpasang, selain itu stdlib
+    """
+    encoder = encoder or os.environ.get('JSON_ENCODER', 'auto')
+    if encoder == 'auto':
+        encoder = 'orjson' if orjson is not None else 'stdlib'
+    if encoder not in JSON_PROVIDERS:
+        raise ValueError(f"Unknown JSON encoder '{encoder}', choose from {sorted(JSON_PROVIDERS)}")
+    provider = JSON_PROVIDERS[encoder](app)
+    if os.environ.get('JSON_PRETTY') == '1':
+        provider.compact = False
+    return provider
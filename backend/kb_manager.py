@@ -0,0 +1,123 @@
+# Hot-reload Knowledge Base
+# KnowledgeBase baru di-load dan di-index di background, lalu ditukar secara
+# atomik. Request yang sedang berjalan tetap memakai state lama sampai selesai.
+
+import os
+import signal
+import threading
+import time
+
+
+class KnowledgeBaseManager:
+    """
+    Pemegang state knowledge base yang sedang aktif
+
+    - loader(): membuat KnowledgeBase baru (mis. dari KB_PATH)
+    - factory(kb): membangun state siap pakai dari KnowledgeBase
+      (engine, cache, katalog, ...); state harus punya atribut .kb
+
+    Handler request cukup membaca manager.current sekali di awal lalu memakai
+    state itu sampai selesai. Pergantian state hanya satu assignment atribut,
+    jadi tidak ada request yang tertahan selama reload.
+    """
+
+    def __init__(self, loader, factory):
+        self.loader = loader
+        self.factory = factory
+        self.current = factory(loader())
+        self.loaded_at = time.time()
+        self.reload_count = 0
+        self.last_error = None
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+
+    @property
+    def version(self):
+        return self.current.kb.version
+
+    def reload(self, background=True):
+        """
+        Load + index knowledge base baru lalu tukar secara atomik
+        Return False jika reload lain sedang berjalan.
+        background=False: tunggu sampai selesai (raise jika gagal).
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+
+        if not background:
+            try:
+                self._reload()
+            finally:
+                self._reload_lock.release()
+            return True
+
+        def run():
+            try:
+                self._reload()
+            except Exception:
+                pass  # sudah dicatat di last_error, state lama tetap aktif
+            finally:
+                self._reload_lock.release()
+
+        threading.Thread(target=run, name='kb-reload', daemon=True).start()
+        return True
+
+    def _reload(self):
+        try:
+            state = self.factory(self.loader())
+        except Exception as e:
+            self.last_error = f'{type(e).__name__}: {e}'
+            raise
+        self.current = state
+        self.loaded_at = time.time()
+        self.reload_count += 1
+        self.last_error = None
+
+    @property
+    def reloading(self):
+        return self._reload_lock.locked()
+
+    def status(self):
+        """Info state knowledge base untuk endpoint admin/health"""
+        kb = self.current.kb
+        return {
+            'kb_version': kb.version,
+            'source': kb.source,
+            'total_rules': len(kb.rules),
+            'total_symptoms': len(kb.symptoms),
+            'loaded_at': self.loaded_at,
+            'reload_count': self.reload_count,
+            'reloading': self.reloading,
+            'last_error': self.last_error
+        }
+
+    def install_sighup_handler(self):
+        """Reload saat proses menerima SIGHUP (hanya dari main thread, non-Windows)"""
+        if not hasattr(signal, 'SIGHUP') or threading.current_thread() is not threading.main_thread():
+            return False
+        signal.signal(signal.SIGHUP, lambda signum, frame: self.reload())
+        return True
+
+    def watch(self, path, interval=5.0):
+        """Polling mtime file knowledge base, reload otomatis jika berubah"""
+        if self._watcher is not None or not path:
+            return
+
+        def poll():
+            last = _mtime(path)
+            while True:
+                time.sleep(interval)
+                mtime = _mtime(path)
+                if mtime is not None and mtime != last:
+                    last = mtime
+                    self.reload()
+
+        self._watcher = threading.Thread(target=poll, name='kb-watcher', daemon=True)
+        self._watcher.start()
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
@@ -0,0 +1,416 @@
+# Knowledge base ter-compile yang di-mmap (dibagi antar worker process)
+#
+#   python kb_mmap.py build -o data/kb.kbm                  # KB bawaan
+#   python kb_mmap.py build --kb data/kb.json -o data/kb.kbm
+#   python kb_mmap.py info data/kb.kbm
+#   KB_PATH=data/kb.kbm gunicorn -c gunicorn.conf.py wsgi:app
+#
+# KnowledgeBase biasa membangun dict rules/symptoms dan index sendiri di
+# setiap worker (dan ulang lagi di setiap worker saat hot-reload). File .kbm
+# berisi hasil rebuild_index() dalam bentuk array uint32 + tabel string,
+# dan MappedKnowledgeBase membacanya langsung dari mmap: kondisi rule,
+# posting list, deskripsi gejala dan conclusion tidak di-copy ke heap
+# Python, jadi semua worker memakai page cache yang sama.
+#
+# Yang tetap ada di heap per worker hanya tabel id (kode -> id, rule_id ->
+# position), jumlah kondisi per rule, dan cache Rule yang sedang dipakai
+# (KB_RULE_CACHE, default 4096).
+# Conclusion baru di-decode saat field-nya pertama kali dibaca.
+#
+# Layout file (byte order native mesin yang membangun, section rata 8 byte):
+#   header | tabel section (offset, panjang byte) | section ...
+#   array: condition_offsets/conditions (id kode per rule), posting_offsets/postings
+#          (position rule per kode), totals, salience, fact_sources, unconditional
+#   string: codes, rule_ids, descriptions, conclusions (JSON), extras (JSON)
+#           masing-masing offsets uint32[n + 1] + blob UTF-8
+#
+# File ditulis ke file sementara lalu di-rename, sehingga worker yang masih
+# memakai versi lama tetap membaca inode lama sampai selesai reload.
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Mapping, Sequence
+from functools import lru_cache
+from itertools import islice
+
+from knowledge_base import KnowledgeBase, Conclusion, Rule, _revisions
+from kb_store import KnowledgeBaseError
+
+MAGIC = b'KBMMAP\0\0'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('=8sII16sIIII')  # magic, format, byteorder, kb_version, n_symptoms, n_codes, n_rules, n_sections
+SECTION = struct.Struct('=QQ')
+
+ARRAYS = (
+    ('condition_offsets', 'I'),
+    ('conditions', 'I'),
+    ('posting_offsets', 'I'),
+    ('postings', 'I'),
+    ('totals', 'I'),
+    ('salience', 'i'),
+    ('fact_sources', 'I'),
+    ('unconditional', 'I'),
+)
+STRING_TABLES = ('codes', 'rule_ids', 'descriptions', 'conclusions', 'extras')
+SECTIONS = tuple(name for name, _ in ARRAYS) + tuple(
+    f'{name}{part}' for name in STRING_TABLES for part in ('_offsets', '_blob')
+)
+
+NO_RULE = 0xFFFFFFFF  # fact_sources: kode yang bukan fakta antara
+
+# Jumlah Rule ter-materialisasi yang di-cache per worker
+RULE_CACHE_SIZE = int(os.environ.get('KB_RULE_CACHE', 4096))
+
+
+class StringTable(Sequence):
+    """Tabel string read-only: string ke-i di-decode dari blob saat diakses"""
+
+    __slots__ = ('offsets', 'blob')
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        offsets = self.offsets
+        return str(self.blob[offsets[i]:offsets[i + 1]], 'utf-8')
+
+
+class MappedConclusion(Conclusion):
+    """
+    Conclusion yang field-nya di-decode dari tabel JSON saat pertama dibaca
+    Sebelum itu slot kosong, dan __getattr__ mengisi semuanya sekaligus.
+    """
+
+    __slots__ = ('_source',)
+
+    def __init__(self, table, index):
+        self._source = (table, index)
+
+    def __getattr__(self, name):
+        if name == '_source':
+            raise AttributeError(name)
+        table, index = self._source
+        Conclusion.__init__(self, *Conclusion.fields_of(json.loads(table[index])))
+        return object.__getattribute__(self, name)
+
+    def __reduce__(self):
+        # Pickle sebagai Conclusion biasa (mis. hasil diagnosis dari process pool)
+        return Conclusion.from_value, (self.to_dict(),)
+
+
+class MappedRuleList(Sequence):
+    """position -> Rule, dibangun dari file saat diakses (cache LRU terbatas)"""
+
+    def __init__(self, kb, cache_size=RULE_CACHE_SIZE):
+        self.kb = kb
+        self._rule = lru_cache(maxsize=cache_size)(self._build)
+
+    def __len__(self):
+        return len(self.kb.rule_ids)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self._rule(i) for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError('rule position out of range')
+        return self._rule(position)
+
+    def _build(self, position):
+        kb = self.kb
+        offsets = kb._condition_offsets
+        conditions = tuple(map(kb.codes.__getitem__, kb._conditions[offsets[position]:offsets[position + 1]]))
+        extras = kb._extras
+        extra = None
+        if extras.offsets[position + 1] > extras.offsets[position]:
+            extra = json.loads(extras[position])
+        return Rule(
+            kb.rule_ids[position], position, conditions,
+            MappedConclusion(kb._conclusions, position), kb._salience[position], extra
+        )
+
+
+class MappedRules(Mapping):
+    """rule_id -> Rule (urutan sama dengan file)"""
+
+    def __init__(self, kb):
+        self.positions = {rule_id: i for i, rule_id in enumerate(kb.rule_ids)}
+        self.rule_list = kb.rule_list
+        self._rule = kb.rule_list._rule
+
+    def __getitem__(self, rule_id):
+        return self._rule(self.positions[rule_id])
+
+    def get(self, rule_id, default=None):
+        position = self.positions.get(rule_id)
+        return default if position is None else self._rule(position)
+
+    def __contains__(self, rule_id):
+        return rule_id in self.positions
+
+    def __iter__(self):
+        return iter(self.positions)
+
+    def __len__(self):
+        return len(self.positions)
+
+
+class MappedSymptoms(Mapping):
+    """Kode gejala -> deskripsi, deskripsi dibaca dari tabel string"""
+
+    def __init__(self, kb, n_symptoms):
+        self.code_ids = kb.code_ids
+        self.codes = kb.codes
+        self.n_symptoms = n_symptoms
+        self.descriptions = kb._descriptions
+
+    def __getitem__(self, code):
+        i = self.code_ids[code]
+        if i >= self.n_symptoms:
+            raise KeyError(code)
+        return self.descriptions[i]
+
+    def __contains__(self, code):
+        i = self.code_ids.get(code)
+        return i is not None and i < self.n_symptoms
+
+    def __iter__(self):
+        return islice(self.codes, self.n_symptoms)
+
+    def __len__(self):
+        return self.n_symptoms
+
+
+class MappedPostings(Mapping):
+    """Kode -> memoryview position rule (slice zero-copy dari file)"""
+
+    def __init__(self, kb):
+        self.code_ids = kb.code_ids
+        self.codes = kb.codes
+        self.offsets = kb._posting_offsets
+        self.positions = kb._postings
+
+    def get(self, code, default=None):
+        i = self.code_ids.get(code)
+        if i is None:
+            return default
+        offsets = self.offsets
+        start, end = offsets[i], offsets[i + 1]
+        return self.positions[start:end] if end > start else default
+
+    def __getitem__(self, code):
+        positions = self.get(code)
+        if positions is None:
+            raise KeyError(code)
+        return positions
+
+    def __contains__(self, code):
+        return self.get(code) is not None
+
+    def __iter__(self):
+        offsets = self.offsets
+        return (code for i, code in enumerate(self.codes) if offsets[i + 1] > offsets[i])
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class MappedKnowledgeBase(KnowledgeBase):
+    """
+    KnowledgeBase read-only yang dibaca langsung dari file .kbm (mmap)
+
+    Atribut yang dipakai engine, matcher dan API sama dengan KnowledgeBase
+    (rules, rule_list, symptoms, postings, condition_totals, code_ids, ...),
+    tapi isinya view ke file. Mengubah rules lalu memanggil rebuild_index()
+    tetap bisa; hasilnya index biasa di heap.
+    """
+
+    def __init__(self, buffer, source=None, cache_size=RULE_CACHE_SIZE):
+        magic, fmt, byteorder, kb_version, n_symptoms, n_codes, n_rules, n_sections = \
+            HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise KnowledgeBaseError(f'Not a compiled knowledge base (format {FORMAT_VERSION}): {source}')
+        if byteorder != (sys.byteorder == 'little'):
+            raise KnowledgeBaseError(f'Compiled knowledge base built with a different byte order: {source}')
+        if n_sections != len(SECTIONS):
+            raise KnowledgeBaseError(f'Compiled knowledge base has unexpected sections: {source}')
+
+        self._buffer = buffer
+        view = memoryview(buffer)
+        sections = {}
+        for i, name in enumerate(SECTIONS):
+            offset, length = SECTION.unpack_from(buffer, HEADER.size + i * SECTION.size)
+            sections[name] = view[offset:offset + length]
+        for name, typecode in ARRAYS:
+            setattr(self, f'_{name}', sections[name].cast(typecode))
+        tables = {
+            name: StringTable(sections[f'{name}_offsets'].cast('I'), sections[f'{name}_blob'])
+            for name in STRING_TABLES
+        }
+        self._descriptions = tables['descriptions']
+        self._conclusions = tables['conclusions']
+        self._extras = tables['extras']
+
+        intern = sys.intern
+        self.source = source or 'mmap'
+        self.version = kb_version.decode('ascii')
+        self.codes = [intern(code) for code in tables['codes']]
+        self.code_ids = {code: i for i, code in enumerate(self.codes)}
+        self.rule_ids = [intern(rule_id) for rule_id in tables['rule_ids']]
+        self.rule_list = MappedRuleList(self, cache_size)
+        self.rules = MappedRules(self)
+        self.symptoms = MappedSymptoms(self, n_symptoms)
+        self.postings = MappedPostings(self)
+        # list, bukan view: dibaca untuk setiap kandidat di matcher (int kecil di-cache Python)
+        self.condition_totals = self._totals.tolist()
+        self.unconditional_rules = tuple(self._unconditional)
+        self.fact_sources = {
+            self.codes[i]: self.rule_ids[position]
+            for i, position in enumerate(self._fact_sources) if position != NO_RULE
+        }
+        self.revision = next(_revisions)
+
+    @classmethod
+    def open(cls, path, cache_size=RULE_CACHE_SIZE):
+        """Buka file .kbm dengan mmap read-only (dibagi antar proses lewat page cache)"""
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer, source=path, cache_size=cache_size)
+
+    def __reduce__(self):
+        # Proses lain (mis. multiprocessing) membuka ulang file yang sama
+        return MappedKnowledgeBase.open, (self.source,)
+
+
+def _string_table(strings):
+    offsets = array('I', [0])
+    blob = bytearray()
+    for value in strings:
+        blob += value.encode('utf-8')
+        offsets.append(len(blob))
+    return offsets.tobytes(), bytes(blob)
+
+
+def write_mapped_kb(kb, path):
+    """
+    Compile KnowledgeBase (yang sudah di-index) ke file .kbm secara atomik
+    Return: dict ringkasan (version, jumlah rule/kode, ukuran file).
+    """
+    rule_list = kb.rule_list
+    codes = kb.codes
+    code_ids = kb.code_ids
+
+    condition_offsets = array('I', [0])
+    conditions = array('I')
+    for rule in rule_list:
+        conditions.extend(code_ids[code] for code in rule.conditions)
+        condition_offsets.append(len(conditions))
+
+    posting_offsets = array('I', [0])
+    postings = array('I')
+    for code in codes:
+        postings.extend(kb.postings.get(code, ()))
+        posting_offsets.append(len(postings))
+
+    arrays = {
+        'condition_offsets': condition_offsets,
+        'conditions': conditions,
+        'posting_offsets': posting_offsets,
+        'postings': postings,
+        'totals': array('I', kb.condition_totals),
+        'salience': array('i', [rule.salience for rule in rule_list]),
+        'fact_sources': array('I', [
+            kb.rules[kb.fact_sources[code]].position if code in kb.fact_sources else NO_RULE
+            for code in codes
+        ]),
+        'unconditional': array('I', kb.unconditional_rules),
+    }
+    sections = {name: data.tobytes() for name, data in arrays.items()}
+    strings = {
+        'codes': codes,
+        'rule_ids': [rule.id for rule in rule_list],
+        'descriptions': list(kb.symptoms.values()),
+        'conclusions': [
+            json.dumps(rule.conclusion.to_dict(), ensure_ascii=False, separators=(',', ':'))
+            for rule in rule_list
+        ],
+        'extras': [
+            json.dumps(rule.extra, ensure_ascii=False, separators=(',', ':')) if rule.extra else ''
+            for rule in rule_list
+        ],
+    }
+    for name, values in strings.items():
+        sections[f'{name}_offsets'], sections[f'{name}_blob'] = _string_table(values)
+
+    offset = HEADER.size + SECTION.size * len(SECTIONS)
+    table = []
+    for name in SECTIONS:
+        offset = (offset + 7) & ~7
+        table.append((offset, len(sections[name])))
+        offset += len(sections[name])
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(
+            MAGIC, FORMAT_VERSION, sys.byteorder == 'little', kb.version.encode('ascii'),
+            len(kb.symptoms), len(codes), len(rule_list), len(SECTIONS)
+        ))
+        for entry in table:
+            f.write(SECTION.pack(*entry))
+        for name, (start, _) in zip(SECTIONS, table):
+            f.write(b'\0' * (start - f.tell()))
+            f.write(sections[name])
+        size = f.tell()
+    os.replace(tmp, path)
+
+    return {
+        'kb_version': kb.version,
+        'rules': len(rule_list),
+        'symptoms': len(kb.symptoms),
+        'codes': len(codes),
+        'bytes': size
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from kb_store import load_knowledge_base
+
+    parser = argparse.ArgumentParser(description='Knowledge base ter-compile untuk mmap')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build_cmd = sub.add_parser('build', help='Compile knowledge base ke file .kbm')
+    build_cmd.add_argument('--kb', help='file knowledge base (default: bawaan)')
+    build_cmd.add_argument('-o', '--output', required=True)
+
+    info_cmd = sub.add_parser('info', help='Tampilkan ringkasan file .kbm')
+    info_cmd.add_argument('path')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        started = time.perf_counter()
+        kb = load_knowledge_base(args.kb) if args.kb else KnowledgeBase()
+        summary = write_mapped_kb(kb, args.output)
+        print(f"✅ {summary['rules']} rules, {summary['symptoms']} symptoms "
+              f"({summary['bytes'] / 1e6:.1f} MB) -> {args.output} in {time.perf_counter() - started:.1f}s")
+        print(f"   kb_version {summary['kb_version']}")
+    else:
+        kb = MappedKnowledgeBase.open(args.path)
+        print(json.dumps({
+            'kb_version': kb.version,
+            'rules': len(kb.rules),
+            'symptoms': len(kb.symptoms),
+            'codes': len(kb.codes),
+            'bytes': os.path.getsize(args.path)
+        }, indent=2))
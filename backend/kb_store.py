@@ -0,0 +1,329 @@
+# Penyimpanan Knowledge Base di luar kode
+# Load/simpan knowledge base dari file JSON, YAML atau SQLite, dengan
+# validasi schema, version hash dan snapshot ter-compile untuk startup cepat
+#
+# Format file (JSON/YAML):
+# {
+#     "schema_version": 1,
+#     "symptoms": {"P01": "Deskripsi gejala", ...},
+#     "rules": {
+#         "R01": {
+#             "conditions": ["P02", "P03"],
+#             "salience": 0,                      // opsional
+#             "conclusion": {
+#                 "diagnosis": "...", "category": "...", "severity": "...",
+#                 "solutions": ["..."], "description": "...",
+#                 "asserts": ["F_POWER"]          // opsional, fakta antara
+#             }
+#         }
+#     }
+# }
+
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import struct
+
+from knowledge_base import KnowledgeBase, SCHEMA_VERSION
+
+try:
+    import yaml
+except ImportError:  # PyYAML opsional, hanya untuk file .yaml/.yml
+    yaml = None
+
+# Naikkan jika struktur KnowledgeBase berubah (snapshot lama jadi tidak valid)
+SNAPSHOT_FORMAT = 3
+
+CONCLUSION_FIELDS = {
+    'diagnosis': str,
+    'category': str,
+    'severity': str,
+    'description': str
+}
+
+
+class KnowledgeBaseError(ValueError):
+    """File knowledge base tidak valid atau tidak bisa dibaca"""
+
+
+def validate(data):
+    """
+    Validasi data knowledge base (dict hasil parse file)
+    Raise KnowledgeBaseError berisi semua masalah yang ditemukan
+    """
+    if not isinstance(data, dict):
+        raise KnowledgeBaseError('Knowledge base must be an object')
+
+    errors = []
+    schema_version = data.get('schema_version', SCHEMA_VERSION)
+    if schema_version != SCHEMA_VERSION:
+        errors.append(f'Unsupported schema_version {schema_version!r} (expected {SCHEMA_VERSION})')
+
+    symptoms = data.get('symptoms')
+    rules = data.get('rules')
+    if not isinstance(symptoms, dict) or not symptoms:
+        errors.append("'symptoms' must be a non-empty object of code -> description")
+        symptoms = {}
+    if not isinstance(rules, dict) or not rules:
+        errors.append("'rules' must be a non-empty object of rule_id -> rule")
+        rules = {}
+
+    for code, description in symptoms.items():
+        if not isinstance(description, str):
+            errors.append(f'Symptom {code}: description must be a string')
+
+    asserted = set()
+    for rule in rules.values():
+        if isinstance(rule, dict) and isinstance(rule.get('conclusion'), dict):
+            asserts = rule['conclusion'].get('asserts', [])
+            if isinstance(asserts, list):
+                asserted.update(a for a in asserts if isinstance(a, str))
+
+    for rule_id, rule in rules.items():
+        if not isinstance(rule, dict):
+            errors.append(f'Rule {rule_id}: must be an object')
+            continue
+
+        conditions = rule.get('conditions')
+        if not isinstance(conditions, list) or not all(isinstance(c, str) for c in conditions):
+            errors.append(f'Rule {rule_id}: conditions must be a list of codes')
+        else:
+            unknown = [c for c in conditions if c not in symptoms and c not in asserted]
+            if unknown:
+                errors.append(f'Rule {rule_id}: unknown condition codes {unknown}')
+
+        salience = rule.get('salience', 0)
+        if isinstance(salience, bool) or not isinstance(salience, int):
+            errors.append(f'Rule {rule_id}: salience must be an integer')
+
+        conclusion = rule.get('conclusion')
+        if not isinstance(conclusion, dict):
+            errors.append(f'Rule {rule_id}: conclusion must be an object')
+            continue
+        for field, field_type in CONCLUSION_FIELDS.items():
+            if not isinstance(conclusion.get(field), field_type):
+                errors.append(f'Rule {rule_id}: conclusion.{field} must be a string')
+        solutions = conclusion.get('solutions')
+        if not isinstance(solutions, list) or not all(isinstance(s, str) for s in solutions):
+            errors.append(f'Rule {rule_id}: conclusion.solutions must be a list of strings')
+        asserts = conclusion.get('asserts', [])
+        if not isinstance(asserts, list) or not all(isinstance(a, str) for a in asserts):
+            errors.append(f'Rule {rule_id}: conclusion.asserts must be a list of fact codes')
+
+    if errors:
+        raise KnowledgeBaseError('Invalid knowledge base:\n  - ' + '\n  - '.join(errors))
+
+
+def _read_json(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _read_yaml(path):
+    if yaml is None:
+        raise KnowledgeBaseError('PyYAML is required to load YAML knowledge bases')
+    with open(path, encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+
+def _read_sqlite(path):
+    """
+    Schema SQLite:
+        metadata(key TEXT PRIMARY KEY, value TEXT)
+        symptoms(code TEXT PRIMARY KEY, position INTEGER, description TEXT)
+        rules(rule_id TEXT PRIMARY KEY, position INTEGER, salience INTEGER, conclusion TEXT)  -- conclusion: JSON
+        rule_conditions(rule_id TEXT, position INTEGER, code TEXT)
+    """
+    try:
+        conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    except sqlite3.Error as e:
+        raise KnowledgeBaseError(f'Cannot read SQLite knowledge base {path}: {e}') from e
+    try:
+        metadata = dict(conn.execute('SELECT key, value FROM metadata'))
+        symptoms = dict(conn.execute('SELECT code, description FROM symptoms ORDER BY position'))
+        rules = {}
+        for rule_id, salience, conclusion in conn.execute(
+                'SELECT rule_id, salience, conclusion FROM rules ORDER BY position'):
+            rules[rule_id] = {'conditions': [], 'conclusion': json.loads(conclusion)}
+            if salience:
+                rules[rule_id]['salience'] = salience
+        for rule_id, code in conn.execute(
+                'SELECT rule_id, code FROM rule_conditions ORDER BY rule_id, position'):
+            if rule_id in rules:
+                rules[rule_id]['conditions'].append(code)
+    except sqlite3.Error as e:
+        raise KnowledgeBaseError(f'Cannot read SQLite knowledge base {path}: {e}') from e
+    finally:
+        conn.close()
+
+    return {
+        'schema_version': int(metadata.get('schema_version', SCHEMA_VERSION)),
+        'symptoms': symptoms,
+        'rules': rules
+    }
+
+
+READERS = {
+    '.json': _read_json,
+    '.yaml': _read_yaml,
+    '.yml': _read_yaml,
+    '.db': _read_sqlite,
+    '.sqlite': _read_sqlite,
+    '.sqlite3': _read_sqlite
+}
+
+
+def read_data(path):
+    """Parse + validasi file knowledge base, return dict data"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in READERS:
+        raise KnowledgeBaseError(f'Unsupported knowledge base format: {ext or path}')
+    try:
+        data = READERS[ext](path)
+    except (OSError, ValueError) as e:
+        if isinstance(e, KnowledgeBaseError):
+            raise
+        raise KnowledgeBaseError(f'Cannot read knowledge base {path}: {e}') from e
+    validate(data)
+    return data
+
+
+def source_hash(path):
+    """Hash isi file sumber + format snapshot, dipakai sebagai key snapshot"""
+    digest = hashlib.sha256(f'{SNAPSHOT_FORMAT}:'.encode())
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def snapshot_path(path, cache_dir):
+    """Lokasi snapshot ter-compile untuk file sumber tertentu"""
+    name = os.path.basename(path)
+    return os.path.join(cache_dir, f'{name}.{source_hash(path)}.kbc')
+
+
+def load_knowledge_base(path, cache_dir=None):
+    """
+    Load KnowledgeBase dari file JSON/YAML/SQLite
+
+    Jika cache_dir diisi, KnowledgeBase yang sudah di-index disimpan sebagai
+    snapshot pickle (key = hash file sumber). Startup berikutnya dengan file
+    yang sama cukup unpickle snapshot tanpa parse, validasi dan indexing ulang.
+    Snapshot hanya boleh dibaca dari direktori yang dipercaya (pickle).
+
+    File .kbm (kb_mmap.py) sudah ter-compile: langsung di-mmap tanpa snapshot.
+    """
+    if os.path.splitext(path)[1].lower() == '.kbm':
+        from kb_mmap import MappedKnowledgeBase
+        try:
+            return MappedKnowledgeBase.open(path)
+        except (OSError, ValueError, struct.error) as e:
+            if isinstance(e, KnowledgeBaseError):
+                raise
+            raise KnowledgeBaseError(f'Cannot read knowledge base {path}: {e}') from e
+
+    snapshot = snapshot_path(path, cache_dir) if cache_dir else None
+    if snapshot and os.path.exists(snapshot):
+        try:
+            with open(snapshot, 'rb') as f:
+                kb = pickle.load(f)
+            if isinstance(kb, KnowledgeBase):
+                return kb
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            pass  # snapshot rusak: build ulang dari sumber
+
+    data = read_data(path)
+    kb = KnowledgeBase(rules=data['rules'], symptoms=data['symptoms'], source=path)
+
+    if snapshot:
+        write_snapshot(kb, snapshot)
+    return kb
+
+
+def write_snapshot(kb, snapshot):
+    """Tulis snapshot secara atomik (tulis file sementara lalu rename)"""
+    os.makedirs(os.path.dirname(snapshot) or '.', exist_ok=True)
+    tmp = f'{snapshot}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump(kb, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, snapshot)
+
+
+def save_knowledge_base(kb, path):
+    """Simpan KnowledgeBase ke file JSON/YAML/SQLite (format dari ekstensi)"""
+    data = kb.to_dict()
+    ext = os.path.splitext(path)[1].lower()
+
+    if ext == '.json':
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+    elif ext in ('.yaml', '.yml'):
+        if yaml is None:
+            raise KnowledgeBaseError('PyYAML is required to write YAML knowledge bases')
+        with open(path, 'w', encoding='utf-8') as f:
+            yaml.safe_dump(data, f, allow_unicode=True, sort_keys=False)
+    elif ext in ('.db', '.sqlite', '.sqlite3'):
+        if os.path.exists(path):
+            os.remove(path)
+        conn = sqlite3.connect(path)
+        try:
+            with conn:
+                conn.executescript('''
+                    CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT);
+                    CREATE TABLE symptoms (code TEXT PRIMARY KEY, position INTEGER, description TEXT);
+                    CREATE TABLE rules (rule_id TEXT PRIMARY KEY, position INTEGER, salience INTEGER, conclusion TEXT);
+                    CREATE TABLE rule_conditions (rule_id TEXT, position INTEGER, code TEXT);
+                ''')
+                conn.executemany('INSERT INTO metadata VALUES (?, ?)', [
+                    ('schema_version', str(SCHEMA_VERSION)),
+                    ('version', kb.version)
+                ])
+                conn.executemany('INSERT INTO symptoms VALUES (?, ?, ?)', [
+                    (code, i, desc) for i, (code, desc) in enumerate(kb.symptoms.items())
+                ])
+                conn.executemany('INSERT INTO rules VALUES (?, ?, ?, ?)', [
+                    (rule_id, i, rule.salience, json.dumps(rule.conclusion.to_dict(), ensure_ascii=False))
+                    for i, (rule_id, rule) in enumerate(kb.rules.items())
+                ])
+                conn.executemany('INSERT INTO rule_conditions VALUES (?, ?, ?)', [
+                    (rule_id, i, code)
+                    for rule_id, rule in kb.rules.items()
+                    for i, code in enumerate(rule.conditions)
+                ])
+        finally:
+            conn.close()
+    else:
+        raise KnowledgeBaseError(f'Unsupported knowledge base format: {ext or path}')
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Knowledge base tools')
+    sub = parser.add_subparsers(dest='command', required=True)
+    export_cmd = sub.add_parser('export', help='Export knowledge base bawaan ke file')
+    export_cmd.add_argument('path')
+    validate_cmd = sub.add_parser('validate', help='Validasi file knowledge base')
+    validate_cmd.add_argument('path')
+    compile_cmd = sub.add_parser('compile', help='Buat snapshot ter-compile')
+    compile_cmd.add_argument('path')
+    compile_cmd.add_argument('--cache-dir', default='.kb_cache')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        kb = KnowledgeBase()
+        save_knowledge_base(kb, args.path)
+        print(f"✅ Exported {len(kb.rules)} rules, {len(kb.symptoms)} symptoms -> {args.path} (version {kb.version})")
+    elif args.command == 'validate':
+        data = read_data(args.path)
+        print(f"✅ Valid: {len(data['rules'])} rules, {len(data['symptoms'])} symptoms")
+    else:
+        start = time.perf_counter()
+        kb = load_knowledge_base(args.path, cache_dir=args.cache_dir)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"✅ Snapshot: {snapshot_path(args.path, args.cache_dir)}")
+        print(f"   version {kb.version}, {len(kb.rules)} rules, loaded in {elapsed:.1f} ms")
@@ -2,16 +2,228 @@
 # Berisi rules dan facts untuk forward chaining
 # Data berdasarkan tabel premis-konklusi kelompok
 
+import hashlib
+import itertools
+import json
+import sys
+from array import array
+from collections.abc import Mapping
+
+# Format data knowledge base (dipakai file JSON/YAML/SQLite di kb_store.py)
+SCHEMA_VERSION = 1
+
+# Revision unik global: setiap rebuild index (di instance mana pun) dapat nomor baru
+_revisions = itertools.count(1)
+
+# Field conclusion yang disimpan sebagai slot (field lain masuk ke extra)
+CONCLUSION_SLOTS = ('diagnosis', 'category', 'severity', 'solutions', 'description', 'asserts')
+
+
+class Conclusion(Mapping):
+    """
+    Conclusion rule dalam bentuk compact (__slots__, tuple, string ter-intern)
+    Tetap bisa dibaca seperti dict (conclusion['diagnosis'], .get('asserts')).
+    Dict JSON baru dibuat lewat to_dict() di batas API.
+    """
+
+    __slots__ = CONCLUSION_SLOTS + ('extra',)
+
+    def __init__(self, diagnosis, category, severity, solutions, description, asserts=(), extra=None):
+        self.diagnosis = diagnosis
+        self.category = sys.intern(category) if isinstance(category, str) else category
+        self.severity = sys.intern(severity) if isinstance(severity, str) else severity
+        self.solutions = tuple(solutions)
+        self.description = description
+        self.asserts = tuple(sys.intern(fact) for fact in asserts)
+        self.extra = extra or None
+
+    @classmethod
+    def from_value(cls, value):
+        """Conclusion dari dict (file / data bawaan) atau Conclusion yang sudah ada"""
+        if isinstance(value, Conclusion):
+            return value
+        return cls(*Conclusion.fields_of(value))
+
+    @staticmethod
+    def fields_of(value):
+        """Argumen constructor dari dict conclusion (field di luar slot masuk ke extra)"""
+        extra = {key: v for key, v in value.items() if key not in CONCLUSION_SLOTS}
+        return (
+            value.get('diagnosis'), value.get('category'), value.get('severity'),
+            value.get('solutions', ()), value.get('description'),
+            value.get('asserts', ()), extra
+        )
+
+    def __getitem__(self, key):
+        if key in CONCLUSION_SLOTS:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        for key in CONCLUSION_SLOTS:
+            if key != 'asserts' or self.asserts:
+                yield key
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f'Conclusion({self.diagnosis!r})'
+
+    def to_dict(self):
+        """Dict JSON-ready (list, bukan tuple)"""
+        data = {
+            'diagnosis': self.diagnosis,
+            'category': self.category,
+            'severity': self.severity,
+            'solutions': list(self.solutions),
+            'description': self.description
+        }
+        if self.asserts:
+            data['asserts'] = list(self.asserts)
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+
+class Rule(Mapping):
+    """
+    Rule compact: kondisi unik sebagai tuple string ter-intern
+    position = urutan rule di knowledge base (index ke KnowledgeBase.rule_list)
+    Tetap bisa dibaca seperti dict (rule['conditions'], rule['conclusion']).
+    """
+
+    __slots__ = ('id', 'position', 'conditions', 'salience', 'conclusion', 'extra')
+
+    KEYS = ('conditions', 'salience', 'conclusion')
+
+    def __init__(self, rule_id, position, conditions, conclusion, salience=0, extra=None):
+        self.id = rule_id
+        self.position = position
+        self.conditions = conditions
+        self.conclusion = conclusion
+        self.salience = salience
+        self.extra = extra or None
+
+    def __getitem__(self, key):
+        if key in Rule.KEYS:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield 'conditions'
+        if self.salience:
+            yield 'salience'
+        yield 'conclusion'
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f'Rule({self.id!r}, conditions={self.conditions!r})'
+
+    def to_dict(self):
+        """Dict JSON-ready, format sama dengan file knowledge base"""
+        data = {'conditions': list(self.conditions)}
+        if self.salience:
+            data['salience'] = self.salience
+        data['conclusion'] = self.conclusion.to_dict()
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+
+def json_default(value):
+    """Hook default= untuk json.dumps / JSON provider: Rule dan Conclusion -> dict"""
+    if isinstance(value, (Rule, Conclusion)):
+        return value.to_dict()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
 class KnowledgeBase:
     """
     Knowledge Base untuk sistem pakar deteksi kerusakan laptop
     Menggunakan rule-based system dengan format IF-THEN
     Total: 53 Symptoms (Premis) & 24 Rules (Konklusi)
+    
+    Tanpa argumen, dipakai data bawaan di file ini. rules/symptoms bisa
+    diisi dari file eksternal lewat kb_store.load_knowledge_base().
     """
     
-    def __init__(self):
-        self.rules = self._initialize_rules()
-        self.symptoms = self._initialize_symptoms()
+    def __init__(self, rules=None, symptoms=None, source=None):
+        self.rules = rules if rules is not None else self._initialize_rules()
+        self.symptoms = symptoms if symptoms is not None else self._initialize_symptoms()
+        self.source = source or 'builtin'
+        self.rebuild_index()
+        
+    def __setstate__(self, state):
+        # KB dari snapshot ter-compile (pickle) mendapat revision baru
+        self.__dict__.update(state)
+        self.revision = next(_revisions)
+        
+    def rebuild_index(self):
+        """
+        Compile rules ke bentuk compact + precompute index untuk partial matching
+        Panggil ulang setiap kali self.rules diubah (boleh berisi dict atau Rule).
+        
+        - rules: rule_id -> Rule (__slots__, kondisi unik sebagai tuple, urutan asli)
+        - rule_list: Rule sesuai urutan (position -> Rule)
+        - rule_ids: position -> rule_id (tanpa perlu menyentuh objek Rule)
+        - condition_totals: position -> jumlah kondisi unik
+        - code_ids / codes: kode gejala & fakta -> int kecil (dan sebaliknya);
+          gejala dulu sesuai urutan, lalu fakta antara sesuai urutan rule
+        - postings: symptom/fact code -> array position rule yang memakai kode tsb
+          (inverted index dengan int 4 byte per entry, urut sesuai urutan rule)
+        - unconditional_rules: position rule tanpa kondisi (selalu aktif di strict mode)
+        - fact_sources: fakta antara (conclusion['asserts']) -> rule_id penghasilnya
+        
+        Semua kode, rule_id, category dan severity di-intern sehingga string
+        yang sama dipakai bersama oleh semua rule dan index.
+        
+        revision diganti setiap rebuild, sehingga struktur turunan
+        (matcher, cache) tahu kapan harus di-compile ulang.
+        version adalah hash isi knowledge base (sama isi = sama version).
+        """
+        intern = sys.intern
+        self.symptoms = {intern(code): desc for code, desc in self.symptoms.items()}
+        code_ids = {code: i for i, code in enumerate(self.symptoms)}
+        rules = {}
+        self.fact_sources = {}
+        postings = {}
+        
+        for position, (rule_id, rule) in enumerate(self.rules.items()):
+            rule_id = intern(rule_id)
+            conditions = tuple(dict.fromkeys(intern(code) for code in rule['conditions']))
+            for code in conditions:
+                if code not in code_ids:
+                    code_ids[code] = len(code_ids)
+                postings.setdefault(code, array('I')).append(position)
+            conclusion = Conclusion.from_value(rule['conclusion'])
+            for fact in conclusion.asserts:
+                self.fact_sources.setdefault(fact, rule_id)
+            extra = {key: value for key, value in rule.items() if key not in Rule.KEYS}
+            rules[rule_id] = Rule(rule_id, position, conditions, conclusion, rule.get('salience', 0), extra)
+        
+        self.rules = rules
+        self.rule_list = list(rules.values())
+        self.rule_ids = list(rules)
+        self.condition_totals = [len(rule.conditions) for rule in self.rule_list]
+        self.code_ids = code_ids
+        self.codes = list(code_ids)
+        self.postings = postings
+        self.unconditional_rules = tuple(
+            rule.position for rule in self.rule_list if not rule.conditions
+        )
+        self.version = self.compute_version()
+        self.revision = next(_revisions)
         
     def _initialize_symptoms(self):
         """Daftar 53 gejala (premis) yang bisa dipilih user"""
@@ -486,6 +698,23 @@ class KnowledgeBase:
             }
         }
     
+    def to_dict(self):
+        """Data knowledge base dalam format file (lihat kb_store.py)"""
+        return {
+            'schema_version': SCHEMA_VERSION,
+            'symptoms': dict(self.symptoms),
+            'rules': {rule_id: rule.to_dict() for rule_id, rule in self.rules.items()}
+        }
+    
+    def compute_version(self):
+        """Hash SHA-256 (16 hex) dari isi symptoms + rules dalam bentuk JSON kanonik"""
+        # Urutan symptoms/rules ikut di-hash karena menentukan urutan output
+        canonical = json.dumps(
+            {'symptoms': list(self.symptoms.items()), 'rules': list(self.rules.items())},
+            sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=json_default
+        )
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+    
     def get_all_symptoms(self):
         """Return list of all symptoms"""
         return [{'code': code, 'description': desc} 
@@ -495,10 +724,26 @@ class KnowledgeBase:
         """Get description of a symptom"""
         return self.symptoms.get(symptom_code, "Unknown symptom")
     
+    def describe_condition(self, code):
+        """
+        Deskripsi kondisi rule: gejala, atau fakta antara hasil rule lain
+        (dideskripsikan dengan diagnosis rule penghasilnya)
+        """
+        if code in self.symptoms:
+            return self.symptoms[code]
+        if code in self.fact_sources:
+            return self.rules[self.fact_sources[code]].conclusion.diagnosis
+        return "Unknown symptom"
+    
     def get_all_rules(self):
         """Return all rules"""
         return self.rules
     
+    def get_rules_for_symptom(self, symptom_code):
+        """Return tuple rule_id yang kondisinya memuat symptom_code"""
+        rule_list = self.rule_list
+        return tuple(rule_list[position].id for position in self.postings.get(symptom_code, ()))
+    
     def display_knowledge_base_summary(self):
         """Display ringkasan Knowledge Base"""
         print("="*70)
@@ -0,0 +1,273 @@
+# Tabel lookup hasil diagnosis untuk symptom set kecil (1-3 gejala)
+#
+#   python lookup_table.py build -o lookup.bin                      # KB bawaan, threshold 60 / top_n 5
+#   python lookup_table.py build --kb data/kb.json --settings 60:5,30:10 -o lookup.bin
+#   python lookup_table.py info lookup.bin
+#   LOOKUP_TABLE=lookup.bin python app.py
+#
+# Untuk satu versi knowledge base, hasil partial matching setiap kombinasi
+# 1..max_k gejala dihitung offline lalu disimpan ke file yang di-mmap.
+# Key = bitmask id gejala (KnowledgeBase.code_ids); slot record dihitung
+# langsung dari bit yang set (combinatorial number system), jadi lookup O(1)
+# tanpa index atau hashing. Yang disimpan hanya kandidat teratas
+# (position rule, matched_count) + jumlah kandidat; dict diagnosis dibangun
+# saat lookup, sama persis dengan run(trace='off').
+#
+# Layout file (uint32, byte order native mesin yang membangun):
+#   header | settings (threshold float64, top_n) | offsets[setting][slot] | records
+#   record = [total_candidates, count, position, matched_count, ...]
+#
+# File ditulis ke file sementara lalu di-rename, sehingga worker yang masih
+# memakai tabel lama tetap membaca inode lama yang utuh.
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from itertools import combinations
+from math import comb
+
+from matching import confidence_of
+
+MAGIC = b'KBLOOKUP'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('=8sII16sIIIII')  # magic, format, byteorder, kb_version, n_symptoms, max_k, n_settings, n_slots, n_words
+SETTING = struct.Struct('=dI4x')
+
+DEFAULT_SETTINGS = ((60, 5),)
+
+# Batas jumlah kombinasi (slot) per setting, supaya build tidak meledak
+# untuk knowledge base dengan ribuan gejala
+MAX_SLOTS = 5_000_000
+
+
+class LookupTableError(ValueError):
+    """File tabel lookup tidak valid atau tidak cocok dengan knowledge base"""
+
+
+def parse_settings(spec):
+    """'60:5,30:10' -> ((60.0, 5), (30.0, 10))"""
+    if not isinstance(spec, str):
+        return tuple((float(threshold), int(top_n)) for threshold, top_n in spec)
+    settings = []
+    for part in spec.split(','):
+        threshold, top_n = part.split(':')
+        settings.append((float(threshold), int(top_n)))
+    return tuple(settings)
+
+
+class SlotIndex:
+    """
+    Nomor slot untuk kombinasi 1..max_k id gejala (dari n_symptoms)
+    Kombinasi k gejala menempati slot base[k] .. base[k] + C(n, k) - 1;
+    di dalamnya urutan colex: rank = C(id1, 1) + C(id2, 2) + ... (id terurut).
+    """
+
+    def __init__(self, n_symptoms, max_k):
+        self.base = [0, 0]
+        for k in range(2, max_k + 1):
+            self.base.append(self.base[-1] + comb(n_symptoms, k - 1))
+        self.size = self.base[-1] + comb(n_symptoms, max_k)
+        self.comb = [[comb(x, j) for x in range(n_symptoms)] for j in range(max_k + 1)]
+
+    def slot(self, ids):
+        """Slot untuk list id gejala terurut tanpa duplikat"""
+        comb_table = self.comb
+        rank = self.base[len(ids)]
+        for j, bit in enumerate(ids, 1):
+            rank += comb_table[j][bit]
+        return rank
+
+
+class LookupTable:
+    """
+    Tabel lookup ter-mmap untuk satu versi knowledge base
+
+    get() return (total_candidates, selected) dengan selected berformat sama
+    seperti ForwardChainingEngine._rank(), atau None jika request tidak
+    tercakup (jumlah gejala > max_k, setting threshold/top_n lain, gejala
+    duplikat, atau knowledge base berbeda versi).
+    """
+
+    def __init__(self, buffer, source=None):
+        self.source = source
+        self._buffer = buffer
+        magic, fmt, byteorder, kb_version, n_symptoms, max_k, n_settings, n_slots, n_words = \
+            HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise LookupTableError(f'Not a lookup table (format {FORMAT_VERSION}): {source}')
+        if byteorder != (sys.byteorder == 'little'):
+            raise LookupTableError(f'Lookup table built with a different byte order: {source}')
+
+        self.version = kb_version.decode('ascii')
+        self.n_symptoms = n_symptoms
+        self.max_k = max_k
+        self.n_slots = n_slots
+        offset = HEADER.size
+        self.settings = {}
+        for i in range(n_settings):
+            threshold, top_n = SETTING.unpack_from(buffer, offset)
+            self.settings[(threshold, top_n)] = i
+            offset += SETTING.size
+
+        view = memoryview(buffer)
+        self._offsets = view[offset:offset + 4 * n_settings * n_slots].cast('I')
+        offset += 4 * n_settings * n_slots
+        self._words = view[offset:offset + 4 * n_words].cast('I')
+
+        self.index = SlotIndex(n_symptoms, max_k)
+
+    @classmethod
+    def open(cls, path):
+        """Buka file tabel lookup dengan mmap (read-only, dibagi antar proses)"""
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer, source=path)
+
+    def get(self, kb, symptoms, threshold, top_n):
+        setting = self.settings.get((threshold, top_n))
+        if setting is None or not 0 < len(symptoms) <= self.max_k or kb.version != self.version:
+            return None
+
+        code_ids = kb.code_ids
+        n_symptoms = self.n_symptoms
+        ids = []
+        for code in symptoms:
+            bit = code_ids.get(code)
+            if bit is None or bit >= n_symptoms:
+                return None
+            ids.append(bit)
+        ids.sort()
+        if len(ids) > 1 and any(a == b for a, b in zip(ids, ids[1:])):
+            return None  # gejala duplikat: adaptive threshold berbeda dengan symptom set unik
+
+        words = self._words
+        start = self._offsets[setting * self.n_slots + self.index.slot(ids)]
+        total_candidates, count = words[start], words[start + 1]
+        rule_list = kb.rule_list
+        totals = kb.condition_totals
+        selected = []
+        for i in range(start + 2, start + 2 + 2 * count, 2):
+            position, matched_count = words[i], words[i + 1]
+            selected.append((
+                -round(confidence_of(matched_count, totals[position]), 2),
+                position, rule_list[position].id, matched_count
+            ))
+        return total_candidates, selected
+
+    def close(self):
+        self._offsets.release()
+        self._words.release()
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+
+def build_lookup_table(engine, path, settings=DEFAULT_SETTINGS, max_k=3, progress=None):
+    """
+    Hitung hasil setiap kombinasi 1..max_k gejala untuk setiap (threshold, top_n)
+    lalu tulis tabel lookup ke path. Record yang isinya sama (mis. tanpa
+    kandidat) hanya disimpan sekali.
+    Return: dict ringkasan (slot, record unik, ukuran file).
+    """
+    kb = engine.kb
+    settings = parse_settings(settings)
+    codes = list(kb.symptoms)
+    n_symptoms = len(codes)
+    index = SlotIndex(n_symptoms, max_k)
+    n_slots = index.size
+    if n_slots > MAX_SLOTS:
+        raise LookupTableError(
+            f'{n_slots} combinations of up to {max_k} symptoms exceed MAX_SLOTS ({MAX_SLOTS}); use a smaller max_k'
+        )
+
+    code_ids = kb.code_ids
+    matcher = engine.matcher
+    words = array('I')
+    records = {}
+    offsets = array('I', [0]) * (n_slots * len(settings))
+
+    for s, (threshold, top_n) in enumerate(settings):
+        for k in range(1, max_k + 1):
+            for symptoms in combinations(codes, k):
+                adaptive_threshold = engine._adaptive_threshold(engine.new_session(symptoms, 'off'), symptoms, threshold)
+                matches = matcher.candidates(set(symptoms), adaptive_threshold)
+                selected = engine._rank(matches, top_n)
+                record = [len(matches), len(selected)]
+                for _, _, rule_id, matched_count in selected:
+                    record.extend((kb.rules[rule_id].position, matched_count))
+                record = tuple(record)
+                start = records.get(record)
+                if start is None:
+                    start = records[record] = len(words)
+                    words.extend(record)
+                ids = sorted(code_ids[code] for code in symptoms)
+                offsets[s * n_slots + index.slot(ids)] = start
+        if progress:
+            progress(f'setting threshold={threshold:g} top_n={top_n}: {n_slots} combinations')
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(
+            MAGIC, FORMAT_VERSION, sys.byteorder == 'little', kb.version.encode('ascii'),
+            n_symptoms, max_k, len(settings), n_slots, len(words)
+        ))
+        for threshold, top_n in settings:
+            f.write(SETTING.pack(threshold, top_n))
+        offsets.tofile(f)
+        words.tofile(f)
+        size = f.tell()
+    os.replace(tmp, path)
+
+    return {
+        'kb_version': kb.version,
+        'symptoms': n_symptoms,
+        'max_k': max_k,
+        'settings': [list(setting) for setting in settings],
+        'slots': n_slots * len(settings),
+        'unique_records': len(records),
+        'bytes': size
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import time
+    from knowledge_base import KnowledgeBase
+    from forward_chaining import ForwardChainingEngine
+
+    parser = argparse.ArgumentParser(description='Tabel lookup diagnosis untuk symptom set kecil')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build_cmd = sub.add_parser('build', help='Hitung dan tulis tabel lookup')
+    build_cmd.add_argument('--kb', help='file knowledge base (default: bawaan)')
+    build_cmd.add_argument('--settings', default='60:5', help="pasangan threshold:top_n, mis. '60:5,30:10'")
+    build_cmd.add_argument('--max-k', type=int, default=3, help='jumlah gejala maksimal per kombinasi')
+    build_cmd.add_argument('-o', '--output', required=True)
+
+    info_cmd = sub.add_parser('info', help='Tampilkan header tabel lookup')
+    info_cmd.add_argument('path')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        from kb_store import load_knowledge_base
+        kb = load_knowledge_base(args.kb) if args.kb else KnowledgeBase()
+        started = time.perf_counter()
+        summary = build_lookup_table(
+            ForwardChainingEngine(kb), args.output, args.settings, args.max_k,
+            progress=lambda message: print(f'   {message}')
+        )
+        print(f"✅ {summary['slots']} entries ({summary['unique_records']} unique records, "
+              f"{summary['bytes'] / 1e6:.1f} MB) -> {args.output} in {time.perf_counter() - started:.1f}s")
+        print(f"   kb_version {summary['kb_version']}")
+    else:
+        table = LookupTable.open(args.path)
+        print(json.dumps({
+            'kb_version': table.version,
+            'symptoms': table.n_symptoms,
+            'max_k': table.max_k,
+            'settings': [list(setting) for setting in table.settings],
+            'slots': table.n_slots
+        }, indent=2))
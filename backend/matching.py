@@ -0,0 +1,184 @@
+# Matching backends untuk partial matching di ForwardChainingEngine
+# Setiap matcher di-compile dari KnowledgeBase dan mengembalikan
+# kandidat (rule_id, matched_count) yang lolos threshold
+
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:  # numpy opsional, BitsetMatcher fallback ke bitmask int
+    np = None
+
+# Matriks dense (rules x symptoms) berisi 0/1, disimpan float32 (4 byte per
+# sel) supaya perkalian matriks tetap lewat BLAS; matched count exact sampai
+# 2^24 kondisi. Di atas batas byte ini BitsetMatcher memakai bitmask int
+# supaya memori per proses tidak meledak (64 MB = 16 juta sel).
+MATRIX_DTYPE = np.float32 if np is not None else None
+MAX_DENSE_BYTES = 64 * 1024 * 1024
+
+
+class IndexMatcher:
+    """
+    Matcher default: hitung gejala yang match lewat inverted index
+    (symptom -> position rule) di KnowledgeBase.
+    Hanya rules yang berbagi minimal 1 gejala dengan input yang disentuh.
+    Counting dilakukan per position (int), rule_id baru diambil untuk
+    kandidat yang lolos threshold.
+    """
+
+    def __init__(self, knowledge_base):
+        self.kb = knowledge_base
+        self.revision = knowledge_base.revision
+
+    def candidates(self, user_symptoms, threshold):
+        """
+        Return list (rule_id, matched_count) dengan confidence >= threshold,
+        urut sesuai urutan rule di knowledge base
+        """
+        kb = self.kb
+        postings = kb.postings
+        matched_counts = Counter()
+        for symptom in user_symptoms:
+            rule_positions = postings.get(symptom)
+            if rule_positions:
+                matched_counts.update(rule_positions)
+
+        if threshold <= 0:
+            # Threshold 0%: rules tanpa gejala yang match juga lolos
+            positions = range(len(kb.rule_list))
+        else:
+            positions = sorted(matched_counts)
+
+        rule_ids = kb.rule_ids
+        totals = kb.condition_totals
+        result = []
+        for position in positions:
+            matched_count = matched_counts[position]
+            if confidence_of(matched_count, totals[position]) >= threshold:
+                result.append((rule_ids[position], matched_count))
+        return result
+
+    def batch_candidates(self, symptom_sets, thresholds):
+        """Versi batch dari candidates() untuk banyak symptom set sekaligus"""
+        return [self.candidates(s, t) for s, t in zip(symptom_sets, thresholds)]
+
+
+class BitsetMatcher:
+    """
+    Matcher berbasis bitset: setiap gejala mendapat 1 bit, setiap rule
+    di-encode sebagai bitmask kondisinya.
+
+    Jika numpy tersedia, knowledge base di-compile menjadi matriks
+    (rules x symptoms) sehingga matched count, missing count dan confidence
+    semua rule dihitung dalam satu operasi vektor, dan satu batch symptom set
+    di-score dengan satu perkalian matriks.
+    Tanpa numpy (atau jika matriks melebihi MAX_DENSE_BYTES), dipakai
+    popcount dari bitmask int Python.
+    """
+
+    def __init__(self, knowledge_base):
+        self.kb = knowledge_base
+        self.revision = knowledge_base.revision
+
+        # Bit = id kode ter-intern di knowledge base (gejala, lalu fakta antara)
+        self.bit_positions = bit_positions = knowledge_base.code_ids
+
+        rules = knowledge_base.rule_list
+        self.rule_ids = knowledge_base.rule_ids
+        self.rule_masks = [self.encode(rule.conditions) for rule in rules]
+        self.condition_counts = knowledge_base.condition_totals
+
+        self.matrix = None
+        if self.dense_fits(knowledge_base):
+            matrix = np.zeros((len(self.rule_ids), len(self.bit_positions)), dtype=MATRIX_DTYPE)
+            for row, rule in enumerate(rules):
+                matrix[row, [bit_positions[c] for c in rule.conditions]] = 1
+            self.matrix = matrix
+            self.totals = np.array(self.condition_counts, dtype=np.float64)
+
+    @staticmethod
+    def dense_fits(knowledge_base):
+        """True jika numpy tersedia dan matriks dense knowledge base muat di MAX_DENSE_BYTES"""
+        if np is None:
+            return False
+        cells = len(knowledge_base.rule_ids) * len(knowledge_base.code_ids)
+        return cells * np.dtype(MATRIX_DTYPE).itemsize <= MAX_DENSE_BYTES
+
+    def encode(self, symptoms):
+        """Encode list gejala menjadi bitmask int (gejala tak dikenal diabaikan)"""
+        mask = 0
+        for code in symptoms:
+            bit = self.bit_positions.get(code)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def vector(self, symptoms):
+        """Encode list gejala menjadi vektor 0/1 (numpy)"""
+        vec = np.zeros(len(self.bit_positions), dtype=MATRIX_DTYPE)
+        bits = [self.bit_positions[c] for c in symptoms if c in self.bit_positions]
+        vec[bits] = 1
+        return vec
+
+    def score(self, matched):
+        """
+        Hitung missing count dan confidence semua rule dari matched count
+        (array numpy, atau matriks untuk batch)
+        Dihitung dalam float64 supaya confidence sama persis dengan confidence_of()
+        """
+        matched = matched.astype(np.float64)
+        missing = self.totals - matched
+        with np.errstate(divide='ignore', invalid='ignore'):
+            confidence = np.where(self.totals > 0, (matched / self.totals) * 100, 0.0)
+        return missing, confidence
+
+    def _select(self, matched, confidence, threshold):
+        rows = np.flatnonzero(confidence >= threshold)
+        return [(self.rule_ids[i], int(matched[i])) for i in rows]
+
+    def candidates(self, user_symptoms, threshold):
+        """
+        Return list (rule_id, matched_count) dengan confidence >= threshold,
+        urut sesuai urutan rule di knowledge base
+        """
+        if self.matrix is not None:
+            matched = self.matrix @ self.vector(user_symptoms)
+            _, confidence = self.score(matched)
+            return self._select(matched, confidence, threshold)
+
+        user_mask = self.encode(user_symptoms)
+        result = []
+        for rule_id, rule_mask, total in zip(self.rule_ids, self.rule_masks, self.condition_counts):
+            matched_count = (rule_mask & user_mask).bit_count()
+            if confidence_of(matched_count, total) >= threshold:
+                result.append((rule_id, matched_count))
+        return result
+
+    def batch_candidates(self, symptom_sets, thresholds):
+        """
+        Score banyak symptom set sekaligus
+        Dengan numpy: satu perkalian matriks (batch x symptoms) @ (symptoms x rules)
+        """
+        if self.matrix is None or not symptom_sets:
+            return [self.candidates(s, t) for s, t in zip(symptom_sets, thresholds)]
+
+        batch = np.stack([self.vector(s) for s in symptom_sets])
+        matched = batch @ self.matrix.T
+        _, confidence = self.score(matched)
+        return [
+            self._select(matched[i], confidence[i], threshold)
+            for i, threshold in enumerate(thresholds)
+        ]
+
+
+def confidence_of(matched_count, total_conditions):
+    """Confidence (%) = matched / total * 100, atau 0 jika rule tanpa kondisi"""
+    if total_conditions > 0:
+        return (matched_count / total_conditions) * 100
+    return 0
+
+
+MATCHERS = {
+    'index': IndexMatcher,
+    'bitset': BitsetMatcher,
+}
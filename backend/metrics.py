@@ -0,0 +1,158 @@
+# Metrics latency per tahap diagnosis + counter, format teks Prometheus
+# Dipakai ForwardChainingEngine (tahap inference) dan app.py (tahap request)
+
+import threading
+import time
+from collections import deque
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class StageTimer:
+    """Context manager: ukur durasi satu tahap lalu catat ke Metrics"""
+
+    __slots__ = ('metrics', 'stage', 'started')
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.stage, time.perf_counter() - self.started)
+        return False
+
+
+class Summary:
+    """Durasi satu tahap: count, sum, dan quantile dari window observasi terakhir"""
+
+    def __init__(self, window=2048):
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=window)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.samples.append(value)
+
+    def quantiles(self):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {q: 0.0 for q in QUANTILES}
+        last = len(ordered) - 1
+        return {q: ordered[min(last, int(round(q * last)))] for q in QUANTILES}
+
+
+class Metrics:
+    """
+    Registry metrics thread-safe
+    - observe(stage, seconds): durasi per tahap (summary p50/p95/p99)
+    - inc(name, value, **labels): counter
+    - render(): teks exposition format Prometheus
+
+    begin_request() mengaktifkan pencatatan durasi per tahap untuk thread ini
+    (dipakai untuk header Server-Timing), termasuk tahap di dalam engine.
+    """
+
+    def __init__(self, namespace='laptopdiag', window=2048):
+        self.namespace = namespace
+        self.window = window
+        self._stages = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def stage(self, name):
+        """with metrics.stage('match'): ..."""
+        return StageTimer(self, name)
+
+    def begin_request(self):
+        """Mulai kumpulkan durasi per tahap untuk request di thread ini, return dict-nya"""
+        timings = {}
+        self._local.timings = timings
+        return timings
+
+    def end_request(self):
+        self._local.timings = None
+
+    def observe(self, stage, seconds):
+        timings = getattr(self._local, 'timings', None)
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+        with self._lock:
+            summary = self._stages.get(stage)
+            if summary is None:
+                summary = self._stages[stage] = Summary(self.window)
+            summary.observe(seconds)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self):
+        """Data metrics dalam bentuk dict (untuk debugging / JSON)"""
+        with self._lock:
+            return {
+                'stages': {
+                    stage: dict(count=s.count, sum=s.total, **{f'p{int(q * 100)}': v for q, v in s.quantiles().items()})
+                    for stage, s in self._stages.items()
+                },
+                'counters': {
+                    name + _format_labels(labels): value
+                    for (name, labels), value in self._counters.items()
+                }
+            }
+
+    def render(self, gauges=None):
+        """
+        Teks Prometheus
+        gauges: dict nama -> nilai tambahan (mis. statistik cache) saat scrape
+        """
+        ns = self.namespace
+        lines = [
+            f'# HELP {ns}_stage_seconds Latency per tahap diagnosis',
+            f'# TYPE {ns}_stage_seconds summary'
+        ]
+        with self._lock:
+            for stage, summary in sorted(self._stages.items()):
+                for q, value in summary.quantiles().items():
+                    lines.append(f'{ns}_stage_seconds{{stage="{stage}",quantile="{q}"}} {value:.9f}')
+                lines.append(f'{ns}_stage_seconds_sum{{stage="{stage}"}} {summary.total:.9f}')
+                lines.append(f'{ns}_stage_seconds_count{{stage="{stage}"}} {summary.count}')
+
+            declared = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                metric = f'{ns}_{name}_total'
+                if metric not in declared:
+                    lines.append(f'# TYPE {metric} counter')
+                    declared.add(metric)
+                lines.append(f'{metric}{_format_labels(labels)} {value}')
+
+        for name, value in sorted((gauges or {}).items()):
+            metric = f'{ns}_{name}'
+            lines.append(f'# TYPE {metric} gauge')
+            lines.append(f'{metric} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    inner = ','.join(f'{k}="{_escape(v)}"' for k, v in labels)
+    return '{' + inner + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def server_timing(timings):
+    """Nilai header Server-Timing dari dict stage -> detik"""
+    return ', '.join(f'{stage};dur={seconds * 1000:.3f}' for stage, seconds in timings.items())
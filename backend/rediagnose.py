@@ -0,0 +1,438 @@
+# Re-diagnosis offline: jalankan ulang tiket historis lewat ForwardChainingEngine
+#
+#   python rediagnose.py run tickets.jsonl --kb data/kb.kbm -o results.jsonl
+#   python rediagnose.py diff tickets.csv --old data/kb_v1.json --new data/kb_v2.json \
+#       -o diff.jsonl --summary diff_summary.json
+#
+# Input dibaca streaming:
+#   .jsonl/.ndjson  satu body request per baris (format sama dengan trace synthetic.py):
+#                   {"id": "T-1", "symptoms": ["P01", "P02"], "threshold": 60, "top_n": 5, "strict_mode": false}
+#   .csv            kolom symptoms (kode dipisah ';', ',' atau spasi), opsional id/threshold/top_n/strict_mode
+# Tiket divalidasi dengan aturan yang sama seperti /api/diagnose (RequestValidator);
+# tiket yang tidak valid untuk suatu knowledge base dicatat sebagai error, bukan menghentikan run.
+#
+# Tiket dikelompokkan per chunk (--chunk-size) dan dibagi ke process pool
+# (--workers). Setiap worker load knowledge base sekali di initializer; file
+# .kbm (kb_mmap.py) di-mmap sehingga dibagi antar worker lewat page cache.
+# Hasil ditulis sesuai urutan input, dengan jumlah chunk in-flight dibatasi
+# supaya memori tetap konstan untuk jutaan tiket.
+
+import csv
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter, deque
+from functools import partial
+from itertools import islice
+
+from knowledge_base import KnowledgeBase
+from kb_store import load_knowledge_base
+from forward_chaining import ForwardChainingEngine
+from validation import RequestValidator
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Chunk in-flight per worker (antrian kerja di pool + hasil yang menunggu ditulis)
+CHUNKS_PER_WORKER = 2
+
+# Jumlah transisi diagnosis teratas dan rule yang dilaporkan di ringkasan diff
+TOP_TRANSITIONS = 20
+
+_SYMPTOM_SEPARATORS = re.compile(r'[;,\s]+')
+
+# State per worker process (diisi init_worker): [(validator, engine)] per knowledge base
+_engines = []
+_defaults = {}
+_report = None
+
+
+def load_kb(path):
+    """KnowledgeBase dari file (JSON/YAML/SQLite/.kbm), None = data bawaan"""
+    return load_knowledge_base(path) if path else KnowledgeBase()
+
+
+def _csv_value(field, value):
+    if field == 'symptoms':
+        return [code for code in _SYMPTOM_SEPARATORS.split(value) if code]
+    if field == 'threshold':
+        number = float(value)
+        return int(number) if number.is_integer() else number
+    if field == 'top_n':
+        return int(value)
+    if field == 'strict_mode':
+        return value.strip().lower() in ('1', 'true', 'yes')
+    return value
+
+
+def read_tickets(path):
+    """
+    Generator (nomor baris, tiket mentah) dari file JSONL/CSV ('-' = JSONL dari stdin)
+    Tiket mentah = teks baris JSONL atau dict kolom CSV; di-parse oleh
+    parse_ticket() di worker, supaya process utama hanya membaca file.
+    """
+    if path.lower().endswith('.csv'):
+        with open(path, encoding='utf-8', newline='') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                row.pop(None, None)  # kolom berlebih tanpa header diabaikan
+                yield reader.line_num, row
+        return
+
+    f = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    try:
+        for line, text in enumerate(f, 1):
+            if text.strip():
+                yield line, text
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def parse_ticket(raw):
+    """Tiket mentah -> (dict tiket, None) atau (None / {'id'}, pesan error)"""
+    if isinstance(raw, str):
+        try:
+            return json.loads(raw), None
+        except ValueError as e:
+            return None, f'Invalid JSON: {e}'
+    ticket = {}
+    for field, value in raw.items():
+        if value is None or value == '':
+            continue
+        try:
+            ticket[field] = _csv_value(field, value)
+        except ValueError:
+            return ({'id': raw['id']} if raw.get('id') else None), f'Invalid {field}: {value!r}'
+    return ticket, None
+
+
+def chunked(iterable, size):
+    """List berukuran size dari iterable (chunk terakhir bisa lebih kecil)"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def init_worker(kb_paths, matcher='index', defaults=None, report=None):
+    """
+    Initializer process pool: load setiap knowledge base sekali per worker
+    defaults: nilai threshold/top_n/strict_mode untuk tiket yang tidak mengisinya
+    report: fungsi (nomor baris, id, hasil) -> apa pun, dijalankan di worker
+            (mis. format_run / format_diff), None = tuple apa adanya
+    """
+    global _engines, _defaults, _report
+    _engines = []
+    for path in kb_paths:
+        kb = load_kb(path)
+        _engines.append((RequestValidator(kb), ForwardChainingEngine(kb, matcher=matcher, trace='off')))
+    _defaults = defaults or {}
+    _report = report
+
+
+def compact_result(result):
+    """Ringkasan hasil run() untuk disimpan/dibandingkan: rule, diagnosis, confidence"""
+    compact = {
+        'diagnoses': [
+            {
+                'rule_id': diagnosis['rule_id'],
+                'diagnosis': diagnosis['diagnosis']['diagnosis'],
+                # strict mode hanya mengembalikan rule yang match 100%
+                'confidence': diagnosis.get('confidence', 100.0)
+            }
+            for diagnosis in result['diagnoses']
+        ]
+    }
+    if 'total_candidates' in result:
+        compact['total_candidates'] = result['total_candidates']
+    return compact
+
+
+def diagnose_chunk(chunk):
+    """
+    Diagnosis satu chunk [(nomor baris, tiket mentah)] dengan setiap knowledge base
+    Return: list (nomor baris, id tiket, [hasil per knowledge base]) sesuai urutan
+    chunk, atau hasil fungsi report untuk setiap tiket
+    """
+    tickets = [parse_ticket(raw) for _, raw in chunk]
+    per_kb = []
+    for validator, engine in _engines:
+        results = [None] * len(chunk)
+        requests = []
+        positions = []
+        for i, (ticket, error) in enumerate(tickets):
+            if error is None:
+                data = {**_defaults, **ticket} if isinstance(ticket, dict) else ticket
+                params, error = validator.validate(data)
+            if error is not None:
+                results[i] = {'error': error}
+                continue
+            params['trace'] = 'off'
+            requests.append(params)
+            positions.append(i)
+        for i, result in zip(positions, engine.run_batch(requests)):
+            results[i] = compact_result(result)
+        per_kb.append(results)
+
+    report = _report or (lambda *item: item)
+    return [
+        report(line, ticket.get('id') if isinstance(ticket, dict) else None, [results[i] for results in per_kb])
+        for i, ((line, _), (ticket, _)) in enumerate(zip(chunk, tickets))
+    ]
+
+
+def rediagnose(kb_paths, tickets, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, matcher='index',
+               defaults=None, report=None):
+    """
+    Generator (nomor baris, id tiket, [hasil per knowledge base]) sesuai urutan
+    tickets (output read_tickets), atau hasil report(...) per tiket jika diisi.
+    report harus fungsi level modul (dikirim ke worker lewat pickle).
+
+    workers > 1: chunk dibagi ke process pool; maksimal workers * CHUNKS_PER_WORKER
+    chunk in-flight, jadi tickets dibaca sejalan dengan hasil yang ditulis.
+    workers <= 1: dijalankan di process ini (tanpa pool).
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    initargs = (list(kb_paths), matcher, defaults, report)
+    chunks = chunked(tickets, chunk_size)
+
+    if workers <= 1:
+        init_worker(*initargs)
+        for chunk in chunks:
+            yield from diagnose_chunk(chunk)
+        return
+
+    import multiprocessing
+    with multiprocessing.Pool(workers, initializer=init_worker, initargs=initargs) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(diagnose_chunk, (chunk,)))
+            if len(pending) >= workers * CHUNKS_PER_WORKER:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
+
+
+def diff_results(old, new):
+    """
+    Perubahan hasil satu tiket antara knowledge base lama dan baru
+    Return: dict perubahan, atau None jika diagnosis (rule, urutan, confidence) sama
+    """
+    if old.get('error') != new.get('error'):
+        return {'error': [old.get('error'), new.get('error')]}
+    old_diagnoses = old.get('diagnoses', [])
+    new_diagnoses = new.get('diagnoses', [])
+    if old_diagnoses == new_diagnoses:
+        return None
+
+    old_rules = {d['rule_id']: d for d in old_diagnoses}
+    new_rules = {d['rule_id']: d for d in new_diagnoses}
+    changes = {}
+    old_top = old_diagnoses[0]['rule_id'] if old_diagnoses else None
+    new_top = new_diagnoses[0]['rule_id'] if new_diagnoses else None
+    if old_top != new_top:
+        changes['top'] = [old_top, new_top]
+    added = [rule_id for rule_id in new_rules if rule_id not in old_rules]
+    removed = [rule_id for rule_id in old_rules if rule_id not in new_rules]
+    if added:
+        changes['added'] = added
+    if removed:
+        changes['removed'] = removed
+    confidence = {
+        rule_id: [d['confidence'], new_rules[rule_id]['confidence']]
+        for rule_id, d in old_rules.items()
+        if rule_id in new_rules and d['confidence'] != new_rules[rule_id]['confidence']
+    }
+    if confidence:
+        changes['confidence'] = confidence
+    renamed = [
+        rule_id for rule_id, d in old_rules.items()
+        if rule_id in new_rules and d['diagnosis'] != new_rules[rule_id]['diagnosis']
+    ]
+    if renamed:
+        changes['diagnosis_text'] = renamed
+    return changes or {'order': True}
+
+
+def _dumps(record):
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+
+
+def _record(line, ticket_id):
+    record = {'line': line}
+    if ticket_id is not None:
+        record['id'] = ticket_id
+    return record
+
+
+def format_run(line, ticket_id, results):
+    """report untuk 'run': (baris JSONL hasil, tiket tidak valid?)"""
+    record = _record(line, ticket_id)
+    record.update(results[0])
+    return _dumps(record), 'error' in results[0]
+
+
+def format_diff(line, ticket_id, results, write_all=False):
+    """
+    report untuk 'diff': (baris JSONL atau None jika tidak berubah dan not write_all,
+    error di KB lama?, error di KB baru?, perubahan)
+    """
+    old, new = results
+    changes = diff_results(old, new)
+    text = None
+    if changes is not None or write_all:
+        record = _record(line, ticket_id)
+        record.update({'changes': changes, 'old': old, 'new': new})
+        text = _dumps(record)
+    return text, 'error' in old, 'error' in new, changes
+
+
+class DiffSummary:
+    """Agregat perubahan diagnosis untuk semua tiket"""
+
+    def __init__(self, old_version, new_version):
+        self.old_version = old_version
+        self.new_version = new_version
+        self.tickets = 0
+        self.changed = 0
+        self.top_changed = 0
+        self.errors = Counter()
+        self.transitions = Counter()
+        self.rules_added = Counter()
+        self.rules_removed = Counter()
+
+    def add(self, old_error, new_error, changes):
+        self.tickets += 1
+        if old_error:
+            self.errors['old'] += 1
+        if new_error:
+            self.errors['new'] += 1
+        if changes is None:
+            return
+        self.changed += 1
+        if 'top' in changes:
+            self.top_changed += 1
+            self.transitions[tuple(changes['top'])] += 1
+        self.rules_added.update(changes.get('added', ()))
+        self.rules_removed.update(changes.get('removed', ()))
+
+    def to_dict(self):
+        return {
+            'old_kb_version': self.old_version,
+            'new_kb_version': self.new_version,
+            'tickets': self.tickets,
+            'changed': self.changed,
+            'unchanged': self.tickets - self.changed,
+            'top_changed': self.top_changed,
+            'errors': {'old': self.errors['old'], 'new': self.errors['new']},
+            'top_transitions': [
+                {'old': old, 'new': new, 'tickets': count}
+                for (old, new), count in self.transitions.most_common(TOP_TRANSITIONS)
+            ],
+            'rules_added': dict(self.rules_added.most_common(TOP_TRANSITIONS)),
+            'rules_removed': dict(self.rules_removed.most_common(TOP_TRANSITIONS))
+        }
+
+
+class Throughput:
+    """Laporan progress (tiket, tiket/detik) ke stderr setiap interval detik"""
+
+    def __init__(self, interval=5.0, stream=None):
+        self.interval = interval
+        self.stream = stream or sys.stderr
+        self.count = 0
+        self.started = time.perf_counter()
+        self._next = self.started + interval
+
+    def tick(self, n=1):
+        self.count += n
+        if self.interval and time.perf_counter() >= self._next:
+            self._next += self.interval
+            print(f'   {self.count} tickets, {self.rate():.0f} tickets/s', file=self.stream, flush=True)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def rate(self):
+        elapsed = self.elapsed()
+        return self.count / elapsed if elapsed > 0 else 0.0
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Re-diagnosis offline tiket historis')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run_cmd = sub.add_parser('run', help='Diagnosis ulang semua tiket dengan satu knowledge base')
+    run_cmd.add_argument('--kb', help='file knowledge base (default: bawaan)')
+
+    diff_cmd = sub.add_parser('diff', help='Bandingkan diagnosis dua versi knowledge base')
+    diff_cmd.add_argument('--old', help='knowledge base lama (default: bawaan)')
+    diff_cmd.add_argument('--new', required=True, help='knowledge base baru')
+    diff_cmd.add_argument('--all', action='store_true', help='tulis juga tiket yang tidak berubah')
+    diff_cmd.add_argument('--summary', help='tulis ringkasan diff (JSON) ke file ini')
+
+    for cmd in (run_cmd, diff_cmd):
+        cmd.add_argument('tickets', help="file tiket .jsonl/.ndjson/.csv ('-' = JSONL dari stdin)")
+        cmd.add_argument('-o', '--output', help='file hasil JSONL (default: stdout)')
+        cmd.add_argument('--workers', type=int, default=os.cpu_count(), help='jumlah worker process')
+        cmd.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        cmd.add_argument('--matcher', default='index', choices=('index', 'bitset'))
+        cmd.add_argument('--threshold', type=float, help='threshold untuk tiket yang tidak mengisinya')
+        cmd.add_argument('--top-n', type=int, help='top_n untuk tiket yang tidak mengisinya')
+        cmd.add_argument('--progress', type=float, default=5.0, help='interval laporan progress (detik, 0 = mati)')
+    args = parser.parse_args()
+
+    defaults = {}
+    if args.threshold is not None:
+        defaults['threshold'] = int(args.threshold) if args.threshold.is_integer() else args.threshold
+    if args.top_n is not None:
+        defaults['top_n'] = args.top_n
+
+    kb_paths = [args.kb] if args.command == 'run' else [args.old, args.new]
+    # Load sekali di process utama: file rusak gagal sebelum pool dibuat
+    versions = [load_kb(path).version for path in kb_paths]
+
+    if args.command == 'run':
+        report = format_run
+    else:
+        report = partial(format_diff, write_all=args.all)
+
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    progress = Throughput(args.progress)
+    summary = DiffSummary(*versions) if args.command == 'diff' else None
+    errors = 0
+    try:
+        for item in rediagnose(kb_paths, read_tickets(args.tickets), args.workers, args.chunk_size,
+                               args.matcher, defaults, report):
+            text = item[0]
+            if summary is None:
+                errors += item[1]
+            else:
+                summary.add(*item[1:])
+            if text is not None:
+                output.write(text + '\n')
+            progress.tick()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(f"✅ {progress.count} tickets in {progress.elapsed():.1f}s "
+          f"({progress.rate():.0f} tickets/s, {args.workers} workers, chunk {args.chunk_size})", file=sys.stderr)
+    if summary is None:
+        print(f"   kb_version {versions[0]}, {errors} invalid tickets", file=sys.stderr)
+    else:
+        report = summary.to_dict()
+        if args.summary:
+            with open(args.summary, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"   {report['old_kb_version']} -> {report['new_kb_version']}: {report['changed']} changed "
+              f"({report['top_changed']} top diagnosis), {report['unchanged']} unchanged", file=sys.stderr)
+        for transition in report['top_transitions'][:5]:
+            print(f"   {transition['old']} -> {transition['new']}: {transition['tickets']} tickets", file=sys.stderr)
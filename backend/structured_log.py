@@ -0,0 +1,114 @@
+# Structured logging (JSON per baris) lewat QueueHandler
+# Thread request hanya memasukkan record ke antrian; penulisan ke stdout
+# dilakukan thread QueueListener, jadi request tidak tertahan di pipe log.
+#
+# Environment:
+#   LOG_LEVEL        level logging (default INFO)
+#   LOG_SAMPLE_RATE  fraksi request sukses yang di-log, 0.0-1.0 (default 1.0)
+#   LOG_SLOW_MS      request lebih lambat dari ini selalu di-log (default 500)
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+
+LOGGER_NAME = 'laptopdiag'
+
+logger = logging.getLogger(LOGGER_NAME)
+
+_state = {'pid': None, 'listener': None, 'handler': None}
+
+
+class JsonFormatter(logging.Formatter):
+    """Format record sebagai satu baris JSON (field tambahan dari extra={'fields': {...}})"""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging(stream=None):
+    """
+    Pasang QueueHandler + QueueListener untuk logger aplikasi
+    Aman dipanggil berkali-kali; setelah fork (pid berbeda) listener baru
+    dijalankan karena thread listener tidak ikut ter-fork.
+    """
+    if _state['pid'] == os.getpid():
+        return logger
+
+    log_queue = queue.SimpleQueue()
+    if _state['handler'] is None:
+        handler = logging.handlers.QueueHandler(log_queue)
+        logger.addHandler(handler)
+        logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+        logger.propagate = False
+        _state['handler'] = handler
+    else:
+        _state['handler'].queue = log_queue
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter())
+    listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+    listener.start()
+
+    _state['listener'] = listener
+    _state['pid'] = os.getpid()
+    return logger
+
+
+def stop_logging():
+    """Flush antrian dan hentikan listener (saat shutdown)"""
+    listener = _state['listener']
+    if listener is not None and _state['pid'] == os.getpid():
+        listener.stop()
+        _state['listener'] = None
+        _state['pid'] = None
+
+
+class RequestLog:
+    """
+    Satu baris JSON per request dengan sampling
+    Request gagal (status >= 400) dan request lambat selalu di-log.
+    """
+
+    def __init__(self, sample_rate=None, slow_ms=None):
+        self.sample_rate = float(os.environ.get('LOG_SAMPLE_RATE', 1.0)) if sample_rate is None else sample_rate
+        self.slow_ms = float(os.environ.get('LOG_SLOW_MS', 500)) if slow_ms is None else slow_ms
+
+    def start(self):
+        """Return timestamp awal request (dipakai di emit)"""
+        return time.perf_counter()
+
+    def emit(self, event, started, status=200, slow_fields=None, **fields):
+        """
+        slow_fields: callable -> dict field tambahan (mis. durasi per tahap),
+        hanya dievaluasi jika request melewati LOG_SLOW_MS
+        """
+        latency_ms = (time.perf_counter() - started) * 1000
+        slow = latency_ms >= self.slow_ms
+        if status < 400 and not slow and not self._sampled():
+            return
+        if slow and slow_fields is not None:
+            fields.update(slow_fields())
+            fields['slow'] = True
+        fields['event'] = event
+        fields['status'] = status
+        fields['latency_ms'] = round(latency_ms, 3)
+        level = logging.WARNING if status >= 500 else logging.INFO
+        logger.log(level, event, extra={'fields': fields})
+
+    def _sampled(self):
+        rate = self.sample_rate
+        return rate >= 1.0 or (rate > 0 and random.random() < rate)
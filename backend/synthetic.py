@@ -0,0 +1,252 @@
+# Generator knowledge base sintetis + trace request untuk uji skala
+#
+#   python synthetic.py kb --rules 10000 --symptoms 500 --zipf 1.1 -o kb_10k.json
+#   python synthetic.py traffic --kb kb_10k.json --requests 50000 -o trace.ndjson
+#
+# Knowledge base yang dihasilkan memakai format yang sama dengan KnowledgeBase
+# bawaan (bisa disimpan ke JSON/YAML/SQLite lewat kb_store dan dipakai via KB_PATH).
+# Trace request berisi body /api/diagnose, satu JSON per baris.
+
+import bisect
+import itertools
+import json
+import random
+
+from knowledge_base import KnowledgeBase, SCHEMA_VERSION
+
+# Distribusi jumlah kondisi per rule, mengikuti knowledge base bawaan
+CONDITION_LENGTHS = {1: 1, 2: 5, 3: 12, 4: 3, 5: 2, 6: 1}
+
+# Distribusi jumlah gejala per request (kebanyakan user memilih 2-4 gejala)
+SYMPTOM_COUNTS = {1: 10, 2: 25, 3: 25, 4: 18, 5: 10, 6: 6, 7: 4, 8: 2}
+
+
+class ZipfSampler:
+    """
+    Sampling item dengan popularitas Zipfian: bobot rank r = 1 / r^s
+    s=0 berarti uniform; makin besar s makin sedikit item yang mendominasi.
+    """
+
+    def __init__(self, items, s=1.0):
+        self.items = list(items)
+        self.s = s
+        self.cumulative = list(itertools.accumulate(1.0 / (rank ** s) for rank in range(1, len(self.items) + 1)))
+
+    def choice(self, rng):
+        index = bisect.bisect_left(self.cumulative, rng.random() * self.cumulative[-1])
+        return self.items[min(index, len(self.items) - 1)]
+
+    def sample(self, rng, k):
+        """k item unik (tanpa pengembalian)"""
+        k = min(k, len(self.items))
+        if self.s == 0:
+            return rng.sample(self.items, k)
+        picked = {}
+        while len(picked) < k:
+            picked[self.choice(rng)] = None
+        return list(picked)
+
+
+def parse_distribution(spec):
+    """'2:5,3:12,4:3' -> {2: 5, 3: 12, 4: 3}"""
+    if isinstance(spec, dict):
+        return spec
+    distribution = {}
+    for part in spec.split(','):
+        value, weight = part.split(':')
+        distribution[int(value)] = float(weight)
+    return distribution
+
+
+def _draw(rng, distribution):
+    values, weights = zip(*distribution.items())
+    return rng.choices(values, weights)[0]
+
+
+def generate_knowledge_base(n_rules, n_symptoms, condition_lengths=None, zipf=1.0,
+                            chain_ratio=0.0, seed=0):
+    """
+    Data knowledge base sintetis (dict schema kb_store)
+
+    - condition_lengths: distribusi jumlah kondisi per rule ({panjang: bobot})
+    - zipf: skew popularitas gejala (gejala S00000 paling sering dipakai rules)
+    - chain_ratio: fraksi rule yang meng-assert fakta antara (F...) yang
+      menjadi kondisi rule lain, untuk menguji chaining di strict mode
+    """
+    rng = random.Random(seed)
+    symptoms = {f'S{i:05d}': f'Synthetic symptom {i}' for i in range(n_symptoms)}
+    sampler = ZipfSampler(symptoms, zipf)
+    lengths = parse_distribution(condition_lengths or CONDITION_LENGTHS)
+
+    rules = {}
+    for i in range(n_rules):
+        rules[f'R{i:06d}'] = {
+            'conditions': sampler.sample(rng, _draw(rng, lengths)),
+            'conclusion': {
+                'diagnosis': f'Synthetic diagnosis {i}',
+                'category': 'hardware' if i % 2 else 'software',
+                'severity': ('ringan', 'sedang', 'berat')[i % 3],
+                'solutions': [f'Synthetic solution {i}'],
+                'description': f'Synthetic rule {i}'
+            }
+        }
+
+    rule_ids = list(rules)
+    for i in range(int(n_rules * chain_ratio)):
+        source, target = rng.sample(rule_ids, 2)
+        fact = f'F{i:05d}'
+        rules[source]['conclusion'].setdefault('asserts', []).append(fact)
+        rules[target]['conditions'].append(fact)
+
+    return {'schema_version': SCHEMA_VERSION, 'symptoms': symptoms, 'rules': rules}
+
+
+def synthetic_knowledge_base(n_rules, n_symptoms, **options):
+    """KnowledgeBase siap pakai dari generate_knowledge_base()"""
+    data = generate_knowledge_base(n_rules, n_symptoms, **options)
+    return KnowledgeBase(
+        rules=data['rules'],
+        symptoms=data['symptoms'],
+        source=f'synthetic:{n_rules}x{n_symptoms}'
+    )
+
+
+def generate_symptom_sets(kb, n, symptom_counts=None, zipf=0.0, hit_ratio=0.6, seed=0):
+    """
+    n symptom set dengan distribusi jumlah gejala symptom_counts
+    hit_ratio bagian diambil dari kondisi satu rule (+ noise), sisanya acak
+    (dengan skew popularitas zipf), sehingga berisi campuran match tinggi dan rendah.
+    """
+    rng = random.Random(seed)
+    sampler = ZipfSampler(kb.symptoms, zipf)
+    counts = parse_distribution(symptom_counts or SYMPTOM_COUNTS)
+    rule_conditions = [
+        [c for c in rule.conditions if c in kb.symptoms]
+        for rule in kb.rules.values()
+    ]
+
+    symptom_sets = []
+    for _ in range(n):
+        k = min(_draw(rng, counts), len(sampler.items))
+        if rng.random() < hit_ratio:
+            conditions = rng.choice(rule_conditions)
+            picked = dict.fromkeys(rng.sample(conditions, min(k, len(conditions))))
+            while len(picked) < k:
+                picked[sampler.choice(rng)] = None
+            symptom_sets.append(list(picked))
+        else:
+            symptom_sets.append(sampler.sample(rng, k))
+    return symptom_sets
+
+
+def generate_traffic(kb, n, unique=None, repeat_zipf=1.0, symptom_counts=None, zipf=1.0,
+                     hit_ratio=0.6, threshold=60, top_n=5, strict_ratio=0.05,
+                     detailed_ratio=0.25, seed=0):
+    """
+    Trace n request /api/diagnose
+
+    Request diambil dari pool `unique` symptom set berbeda dengan popularitas
+    Zipfian (repeat_zipf), seperti traffic nyata di mana kombinasi gejala umum
+    berulang; cocok untuk menguji hit rate cache. unique=None: semua berbeda.
+    """
+    rng = random.Random(seed)
+    pool = generate_symptom_sets(kb, unique or n, symptom_counts, zipf, hit_ratio, seed)
+    picker = ZipfSampler(range(len(pool)), repeat_zipf) if unique else None
+
+    requests = []
+    for i in range(n):
+        symptoms = pool[picker.choice(rng)] if picker else pool[i]
+        requests.append({
+            'symptoms': symptoms,
+            'threshold': threshold,
+            'top_n': top_n,
+            'strict_mode': rng.random() < strict_ratio,
+            'detailed': rng.random() < detailed_ratio
+        })
+    return requests
+
+
+def describe_traffic(requests):
+    """Ringkasan trace: jumlah request, symptom set unik, share 10 set terpopuler"""
+    counts = {}
+    for request in requests:
+        key = frozenset(request['symptoms'])
+        counts[key] = counts.get(key, 0) + 1
+    top = sorted(counts.values(), reverse=True)[:10]
+    return {
+        'requests': len(requests),
+        'unique_symptom_sets': len(counts),
+        'top10_share': round(sum(top) / len(requests), 4) if requests else 0
+    }
+
+
+def read_traffic(path):
+    """Baca trace NDJSON (satu body request per baris)"""
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def write_traffic(requests, path):
+    """Tulis trace: .ndjson/.jsonl satu request per baris, .json sebagai body /api/diagnose/batch"""
+    with open(path, 'w', encoding='utf-8') as f:
+        if path.endswith('.json'):
+            json.dump({'requests': requests}, f)
+        else:
+            for request in requests:
+                f.write(json.dumps(request) + '\n')
+
+
+if __name__ == "__main__":
+    import argparse
+    from collections import Counter
+    from kb_store import load_knowledge_base, save_knowledge_base
+
+    parser = argparse.ArgumentParser(description='Generator knowledge base dan traffic sintetis')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    kb_cmd = sub.add_parser('kb', help='Buat knowledge base sintetis (JSON/YAML/SQLite)')
+    kb_cmd.add_argument('--rules', type=int, default=10000)
+    kb_cmd.add_argument('--symptoms', type=int, default=500)
+    kb_cmd.add_argument('--lengths', default=None, help="distribusi jumlah kondisi, mis. '2:5,3:12,4:3'")
+    kb_cmd.add_argument('--zipf', type=float, default=1.0, help='skew popularitas gejala (0 = uniform)')
+    kb_cmd.add_argument('--chain-ratio', type=float, default=0.0)
+    kb_cmd.add_argument('--seed', type=int, default=0)
+    kb_cmd.add_argument('-o', '--output', required=True)
+
+    traffic_cmd = sub.add_parser('traffic', help='Buat trace request /api/diagnose')
+    traffic_cmd.add_argument('--kb', help='file knowledge base (default: bawaan)')
+    traffic_cmd.add_argument('--requests', type=int, default=10000)
+    traffic_cmd.add_argument('--unique', type=int, default=None, help='jumlah symptom set berbeda di trace')
+    traffic_cmd.add_argument('--repeat-zipf', type=float, default=1.0, help='skew popularitas symptom set')
+    traffic_cmd.add_argument('--counts', default=None, help="distribusi jumlah gejala, mis. '1:10,2:25,3:25'")
+    traffic_cmd.add_argument('--zipf', type=float, default=1.0, help='skew popularitas gejala')
+    traffic_cmd.add_argument('--hit-ratio', type=float, default=0.6)
+    traffic_cmd.add_argument('--strict-ratio', type=float, default=0.05)
+    traffic_cmd.add_argument('--detailed-ratio', type=float, default=0.25)
+    traffic_cmd.add_argument('--seed', type=int, default=0)
+    traffic_cmd.add_argument('-o', '--output', required=True, help='.ndjson (per baris) atau .json (body batch)')
+    args = parser.parse_args()
+
+    if args.command == 'kb':
+        kb = synthetic_knowledge_base(
+            args.rules, args.symptoms,
+            condition_lengths=args.lengths, zipf=args.zipf,
+            chain_ratio=args.chain_ratio, seed=args.seed
+        )
+        save_knowledge_base(kb, args.output)
+        lengths = Counter(len(rule.conditions) for rule in kb.rules.values())
+        top = sorted(((len(p), code) for code, p in kb.postings.items()), reverse=True)[:3]
+        print(f"✅ {len(kb.rules)} rules, {len(kb.symptoms)} symptoms -> {args.output} (version {kb.version})")
+        print(f"   condition lengths: {dict(sorted(lengths.items()))}")
+        print(f"   most used symptoms: {', '.join(f'{code} ({n} rules)' for n, code in top)}")
+    else:
+        kb = load_knowledge_base(args.kb) if args.kb else KnowledgeBase()
+        requests = generate_traffic(
+            kb, args.requests, unique=args.unique, repeat_zipf=args.repeat_zipf,
+            symptom_counts=args.counts, zipf=args.zipf, hit_ratio=args.hit_ratio,
+            strict_ratio=args.strict_ratio, detailed_ratio=args.detailed_ratio, seed=args.seed
+        )
+        write_traffic(requests, args.output)
+        summary = describe_traffic(requests)
+        print(f"✅ {summary['requests']} requests -> {args.output}")
+        print(f"   {summary['unique_symptom_sets']} unique symptom sets, top 10 = {summary['top10_share']:.1%} of traffic")
@@ -0,0 +1,116 @@
+# Response streaming lewat entry point ASGI dengan banyak request bersamaan
+#   python -m pytest -q test_asgi_streaming.py
+#
+# Request dikirim langsung ke aplikasi ASGI (tanpa server), beberapa sekaligus
+# di satu event loop, sehingga chunk dari response yang berbeda berselang-seling
+# di executor thread yang sama.
+
+import asyncio
+import json
+
+from asgi import WSGIBridgeApp
+from app import app as flask_app
+
+CONCURRENT_REQUESTS = 16
+
+
+async def call(app, path, payload):
+    """Satu request HTTP ke aplikasi ASGI, return (status, body)"""
+    scope = {
+        'type': 'http', 'method': 'POST', 'path': path, 'query_string': b'',
+        'headers': [(b'content-type', b'application/json')], 'http_version': '1.1'
+    }
+    messages = [{'type': 'http.request', 'body': json.dumps(payload).encode(), 'more_body': False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.Event().wait()  # client tetap terhubung
+
+    async def send(message):
+        sent.append(message)
+        await asyncio.sleep(0)  # beri giliran ke response lain di antara chunk
+
+    await app(scope, receive, send)
+    assert sent[0]['type'] == 'http.response.start'
+    assert not sent[-1].get('more_body', False)
+    return sent[0]['status'], b''.join(m.get('body', b'') for m in sent[1:])
+
+
+def run_concurrently(path, payloads):
+    app = WSGIBridgeApp(flask_app, max_workers=4, max_queue=CONCURRENT_REQUESTS)
+
+    async def main():
+        return await asyncio.gather(*(call(app, path, payload) for payload in payloads))
+
+    try:
+        return asyncio.run(main())
+    finally:
+        app.pool.shutdown()
+
+
+def ndjson_events(body):
+    return [json.loads(line) for line in body.decode('utf-8').splitlines()]
+
+
+def test_concurrent_ndjson_diagnose():
+    payloads = [
+        {'symptoms': ['P01', 'P02', f'P{i % 9 + 10:02d}'], 'threshold': 0, 'top_n': 30, 'stream': 'ndjson'}
+        for i in range(CONCURRENT_REQUESTS)
+    ]
+    for status, body in run_concurrently('/api/diagnose', payloads):
+        assert status == 200
+        events = ndjson_events(body)
+        assert events[0]['type'] == 'start'
+        assert events[-1]['type'] == 'summary'
+        assert all(event['type'] != 'error' for event in events)
+
+
+def test_concurrent_ndjson_batch():
+    payload = {
+        'requests': [{'symptoms': ['P01', 'P02'], 'threshold': 0, 'detailed': False}] * 300,
+        'stream': 'ndjson'
+    }
+    for status, body in run_concurrently('/api/diagnose/batch', [payload] * CONCURRENT_REQUESTS):
+        assert status == 200
+        events = ndjson_events(body)
+        assert events[-1] == {'type': 'end', 'total': 300, 'total_errors': 0}
+        assert [event['index'] for event in events[1:-1]] == list(range(300))
+
+
+def test_client_disconnect_stops_stream():
+    # Client putus setelah beberapa chunk: response dihentikan dan slot executor dilepas
+    app = WSGIBridgeApp(flask_app, max_workers=2, max_queue=0, stream_buffer=2)
+    payload = {'requests': [{'symptoms': ['P01'], 'threshold': 0}] * 5000, 'stream': 'ndjson'}
+    scope = {
+        'type': 'http', 'method': 'POST', 'path': '/api/diagnose/batch', 'query_string': b'',
+        'headers': [(b'content-type', b'application/json')], 'http_version': '1.1'
+    }
+
+    async def main():
+        disconnected = asyncio.Event()
+        messages = [{'type': 'http.request', 'body': json.dumps(payload).encode(), 'more_body': False}]
+        sent = []
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+            if len(sent) == 3:
+                disconnected.set()
+            await asyncio.sleep(0)
+
+        await app(scope, receive, send)
+        return sent
+
+    try:
+        sent = asyncio.run(main())
+        assert len(sent) < 100
+        assert app.pool.in_flight == 0
+    finally:
+        app.pool.shutdown()
@@ -0,0 +1,95 @@
+# Stress test re-entrancy ForwardChainingEngine
+#   python -m pytest -q test_engine_concurrency.py
+#
+# Satu engine dipakai bersama banyak thread (seperti di app.py). Setiap hasil
+# concurrent harus identik dengan hasil sekuensial untuk input yang sama:
+# diagnosis, trace, fired rules dan working memory tidak boleh tercampur
+# antar panggilan.
+
+import random
+import sys
+import threading
+
+from knowledge_base import KnowledgeBase
+from forward_chaining import ForwardChainingEngine
+
+THREADS = 32
+CALLS_PER_THREAD = 200
+
+
+def make_cases(kb, n=200, seed=0):
+    """(symptoms, kwargs) acak: partial matching + strict mode dengan rule yang match penuh"""
+    rng = random.Random(seed)
+    codes = list(kb.symptoms)
+    rules = list(kb.rules.values())
+    cases = []
+    for i in range(n):
+        if i % 4 == 0:
+            # Strict mode: kondisi satu rule (+ gejala lain) supaya ada rule yang fire
+            symptoms = list(rng.choice(rules).conditions) + rng.sample(codes, rng.randint(0, 2))
+            kwargs = {'strict_mode': True}
+        else:
+            symptoms = rng.sample(codes, rng.randint(1, 6))
+            kwargs = {'threshold': rng.choice((0, 30, 60)), 'top_n': rng.choice((3, 5, 10))}
+        cases.append((list(dict.fromkeys(symptoms)), kwargs))
+    return cases
+
+
+def snapshot(result):
+    # working_memory berasal dari set, urutannya tidak dijamin
+    return dict(result, working_memory=sorted(result['working_memory']))
+
+
+def run_concurrently(call, cases, expected):
+    """Jalankan call(case) dari THREADS thread sekaligus, return daftar mismatch/error"""
+    failures = []
+    barrier = threading.Barrier(THREADS)
+
+    def worker(seed):
+        rng = random.Random(seed)
+        barrier.wait()
+        for _ in range(CALLS_PER_THREAD):
+            i = rng.randrange(len(cases))
+            try:
+                if call(cases[i]) != expected[i]:
+                    failures.append(('mismatch', i))
+            except Exception as e:
+                failures.append(('error', i, repr(e)))
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # paksa context switch sesering mungkin
+    try:
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(THREADS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        sys.setswitchinterval(interval)
+    return failures
+
+
+def test_run_is_reentrant():
+    kb = KnowledgeBase()
+    engine = ForwardChainingEngine(kb)
+    cases = make_cases(kb)
+
+    def call(case):
+        symptoms, kwargs = case
+        return snapshot(engine.run(symptoms, **kwargs))
+
+    expected = [call(case) for case in cases]
+    assert run_concurrently(call, cases, expected) == []
+
+
+def test_explain_diagnosis_is_reentrant():
+    kb = KnowledgeBase()
+    engine = ForwardChainingEngine(kb)
+    cases = make_cases(kb, seed=1)
+
+    def call(case):
+        symptoms, kwargs = case
+        return engine.explain_diagnosis(symptoms, **kwargs)
+
+    expected = [call(case) for case in cases]
+    assert run_concurrently(call, cases, expected) == []
@@ -0,0 +1,108 @@
+# Validasi request diagnosis (/api/diagnose dan item /api/diagnose/batch)
+# Schema field + batas ukuran dicek sebelum engine dijalankan, dengan
+# tabel kode gejala yang di-compile sekali per versi knowledge base.
+#
+# Environment:
+#   MAX_SYMPTOMS  maksimal gejala per request (default 64)
+#   MAX_TOP_N     maksimal top_n (default 100)
+
+import os
+
+MAX_SYMPTOMS = int(os.environ.get('MAX_SYMPTOMS', 64))
+MAX_TOP_N = int(os.environ.get('MAX_TOP_N', 100))
+
+# Jumlah kode tidak valid yang disebut di pesan error, dan panjang maksimal
+# satu kode (string lebih panjang langsung tidak valid, dipotong di pesan error)
+MAX_REPORTED_CODES = 10
+MAX_CODE_LENGTH = 64
+
+# field -> (default, validator(value) -> bool, pesan error)
+DIAGNOSIS_SCHEMA = {
+    'threshold': (
+        60,  # Default 60%
+        lambda v: not isinstance(v, bool) and isinstance(v, (int, float)) and 0 <= v <= 100,
+        'Threshold must be between 0 and 100'
+    ),
+    'top_n': (
+        5,  # Default 5 results
+        lambda v: not isinstance(v, bool) and isinstance(v, int) and 0 <= v <= MAX_TOP_N,
+        f'top_n must be an integer between 0 and {MAX_TOP_N}'
+    ),
+    'detailed': (True, lambda v: isinstance(v, bool), 'detailed must be a boolean'),
+    'strict_mode': (False, lambda v: isinstance(v, bool), 'strict_mode must be a boolean'),  # Default partial matching
+}
+
+
+class RequestValidator:
+    """
+    Validator request diagnosis untuk satu versi knowledge base
+
+    Tabel kode di-compile sekali: kode gejala -> kode ter-intern di knowledge
+    base, plus alias kanonik (tanpa spasi, huruf besar) untuk input ' p02 '.
+    validate() membatasi panjang list sebelum memeriksa isinya, jadi biaya
+    validasi konstan (maksimal MAX_SYMPTOMS lookup) berapapun ukuran input.
+    """
+
+    def __init__(self, knowledge_base, max_symptoms=MAX_SYMPTOMS):
+        self.max_symptoms = max_symptoms
+        codes = {}
+        for code in knowledge_base.symptoms:
+            codes.setdefault(code.strip().upper(), code)
+        codes.update((code, code) for code in knowledge_base.symptoms)
+        self.codes = codes
+
+    def canonical_symptoms(self, symptoms):
+        """
+        Kode gejala kanonik tanpa duplikat (urutan pertama kali muncul)
+        Return: (list kode, list input yang tidak valid)
+        """
+        codes = self.codes
+        canonical = {}
+        invalid = []
+        for symptom in symptoms:
+            code = None
+            if isinstance(symptom, str):
+                if len(symptom) > MAX_CODE_LENGTH:
+                    symptom = symptom[:MAX_CODE_LENGTH] + '...'
+                else:
+                    code = codes.get(symptom)
+                    if code is None:
+                        code = codes.get(symptom.strip().upper())
+            elif isinstance(symptom, (list, dict)):
+                symptom = f'<{type(symptom).__name__}>'
+            if code is None:
+                invalid.append(symptom)
+            else:
+                canonical[code] = None
+        return list(canonical), invalid
+
+    def validate(self, data):
+        """
+        Validasi dan normalisasi satu request diagnosis
+        Return: (params, None) jika valid, (None, pesan error) jika tidak
+        """
+        if not isinstance(data, dict) or 'symptoms' not in data:
+            return None, 'Symptoms are required'
+
+        symptoms = data['symptoms']
+        if not isinstance(symptoms, list):
+            return None, 'Symptoms must be a list of symptom codes'
+        if len(symptoms) > self.max_symptoms:
+            return None, f'Too many symptoms (max {self.max_symptoms})'
+
+        symptoms, invalid_symptoms = self.canonical_symptoms(symptoms)
+        if invalid_symptoms:
+            reported = invalid_symptoms[:MAX_REPORTED_CODES]
+            more = len(invalid_symptoms) - len(reported)
+            return None, f'Invalid symptom codes: {reported}' + (f' (+{more} more)' if more else '')
+
+        if not symptoms:
+            return None, 'At least one symptom is required'
+
+        params = {'symptoms': symptoms}
+        for field, (default, check, message) in DIAGNOSIS_SCHEMA.items():
+            value = data.get(field, default)
+            if not check(value):
+                return None, message
+            params[field] = value
+        return params, None
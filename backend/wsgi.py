@@ -0,0 +1,8 @@
+# Entry point production (WSGI)
+# gunicorn -c gunicorn.conf.py wsgi:app
+
+from app import app, kb_manager, mark_draining, start_background_tasks, stop_background_tasks
+
+application = app
+
+__all__ = ['app', 'application', 'kb_manager', 'mark_draining', 'start_background_tasks', 'stop_background_tasks']